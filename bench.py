@@ -0,0 +1,542 @@
+#############################################################
+# Offline benchmark:
+#############################################################
+# Drives the real command and button callbacks from main.py with stand-in
+# ctx/Interaction objects, so auctions can be load-tested without Discord.
+#
+#   python bench.py                         # every round file + combined
+#   python bench.py -b 500 -o after.json round_1_auction.json
+#   python bench.py --compare before.json after.json
+#
+# Each scenario imports the player file into an empty league in a scratch
+# directory, registers the bidders' teams, then auctions every player: a
+# seeded random number of bids per lot from random bidders, arriving on a
+# simulated clock, closed with Sold (or Next Player when nobody bid).
+# A separate microbenchmark schedules, extends and fires thousands of lot
+# timers on the shared scheduler (--timers, 0 to skip), --planner times roster
+# plans over a pool of that many players, and --startup times cold imports
+# of main.py and snapshot loads (pickle versus JSON).
+# Results are JSON with sorted keys so two runs can be diffed directly or
+# with --compare.
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import asyncio
+import argparse
+import subprocess
+import glob
+import itertools
+import tempfile
+from collections import Counter
+
+os.environ.setdefault('TOKEN', 'bench')
+import main  # noqa: E402  (bot.run only happens under __main__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FILES = ['combined_auction.json'] + sorted(
+    os.path.basename(path) for path in glob.glob(os.path.join(HERE, 'round_*_auction.json')))
+AUCTIONEER_ID = 1
+
+
+#############################################################
+# Simulated clock:
+#############################################################
+class SimClock:
+  """A clock that only moves when the driver advances it.
+
+  Installed as BidEngine.clock/sleep so render coalescing happens on
+  simulated time while everything else runs as fast as it can.
+  """
+
+  def __init__(self):
+      self.now = 0.0
+      self._sleepers = []
+      self._order = itertools.count()
+
+  def __call__(self):
+      return self.now
+
+  async def sleep(self, delay):
+      future = asyncio.get_running_loop().create_future()
+      heapq.heappush(self._sleepers, (self.now + delay, next(self._order), future))
+      await future
+
+  async def advance(self, seconds):
+      self.now += seconds
+      while self._sleepers and self._sleepers[0][0] <= self.now:
+          _, _, future = heapq.heappop(self._sleepers)
+          if not future.done():
+              future.set_result(None)
+      # Let the woken tasks and the bid worker run.
+      for _ in range(3):
+          await asyncio.sleep(0)
+
+
+#############################################################
+# Stand-in Discord objects:
+#############################################################
+# Every call that would be a Discord API request is counted in CALLS.
+CALLS = Counter()
+
+
+class FakeUser:
+  def __init__(self, id):
+      self.id = id
+      self.name = self.display_name = f"bidder{id}"
+      self.mention = f"<@{id}>"
+
+
+class FakeChannel:
+  def __init__(self, id):
+      self.id = id
+
+  def get_partial_message(self, message_id):
+      return FakeMessage(self, message_id)
+
+
+class FakeMessage:
+  _ids = itertools.count(1000)
+
+  def __init__(self, channel, id=None):
+      self.channel = channel
+      self.id = id if id is not None else next(self._ids)
+
+  async def edit(self, **kwargs):
+      CALLS['message.edit'] += 1
+
+
+class FakeResponse:
+  def __init__(self):
+      self._done = False
+
+  def is_done(self):
+      return self._done
+
+  async def defer(self, **kwargs):
+      CALLS['response.defer'] += 1
+      self._done = True
+
+  async def send_message(self, *args, **kwargs):
+      CALLS['response.send_message'] += 1
+      self._done = True
+
+  async def edit_message(self, **kwargs):
+      CALLS['response.edit_message'] += 1
+      self._done = True
+
+  async def send_modal(self, modal):
+      CALLS['response.send_modal'] += 1
+      self._done = True
+
+
+class FakeFollowup:
+  async def send(self, *args, **kwargs):
+      CALLS['followup.send'] += 1
+
+
+class FakeClient:
+  # Nobody is in the gateway cache, so user lookups go through USER_CACHE.
+  def get_user(self, user_id):
+      return None
+
+  async def fetch_user(self, user_id):
+      CALLS['fetch_user'] += 1
+      return FakeUser(int(user_id))
+
+
+class FakeInteraction:
+  def __init__(self, user, message, client):
+      self.user = user
+      self.message = message
+      self.client = client
+      self.guild_id = None
+      self.channel_id = message.channel.id
+      self.response = FakeResponse()
+      self.followup = FakeFollowup()
+
+
+class FakeContext:
+  def __init__(self, author, channel):
+      self.author = author
+      self.channel = channel
+      self.guild = None
+      self.message = None
+
+  async def send(self, *args, **kwargs):
+      CALLS['ctx.send'] += 1
+      return FakeMessage(self.channel)
+
+
+#############################################################
+# Measurements:
+#############################################################
+def percentile(samples, q):
+  if not samples:
+      return 0.0
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def latency_summary(samples):
+  # Seconds in, milliseconds out.
+  return {
+      'count': len(samples),
+      'p50_ms': round(percentile(samples, 0.50) * 1000, 4),
+      'p99_ms': round(percentile(samples, 0.99) * 1000, 4),
+      'max_ms': round(max(samples, default=0.0) * 1000, 4),
+  }
+
+async def timed(samples, coro):
+  started = time.perf_counter()
+  await coro
+  samples.append(time.perf_counter() - started)
+
+def instrument_store(store):
+  # Wraps the writer thread's _write to time every batch it persists.
+  stats = {'batches': 0, 'events': 0, 'seconds': 0.0}
+  write = store._write
+
+  def timed_write(batch):
+      started = time.perf_counter()
+      write(batch)
+      stats['seconds'] += time.perf_counter() - started
+      stats['batches'] += 1
+      stats['events'] += sum(1 for kind, _ in batch if kind == 'event')
+  store._write = timed_write
+  return stats
+
+
+#############################################################
+# Scenario:
+#############################################################
+async def run_scenario(path, bidders, bids_per_lot, trades, seed, render_interval):
+  rng = random.Random(seed)
+  CALLS.clear()
+  main.USER_CACHE = main.UserCache(main.USER_CACHE_SIZE, main.USER_CACHE_TTL)
+  main.SESSIONS = main.SessionRegistry()
+  channel = FakeChannel(1)
+  client = FakeClient()
+  admin = FakeContext(FakeUser(AUCTIONEER_ID), channel)
+  session = await main.league(admin)
+  store_stats = instrument_store(session.store)
+  session.commit('authorize', user=str(AUCTIONEER_ID))
+
+  with open(path, 'rb') as fp:
+      added, _, _ = await main.import_players(session, path, fp)
+
+  users = [FakeUser(AUCTIONEER_ID + 1 + i) for i in range(bidders)]
+  setup = []
+  for user in users:
+      ctx = FakeContext(user, channel)
+      await timed(setup, main.create_team.callback(ctx, f"Team {user.id}"))
+      await timed(setup, main.set_purse.callback(admin, user, main.MAX_PURSE))
+
+  browse = []
+  for category in [None] + main.CATEGORIES:
+      await timed(browse, main.view_auction_players.callback(admin, category))
+
+  # The engine's own counts cover one lot; the scenario's come from METRICS.
+  outcomes = {outcome: main.METRICS.counter('bids_total', outcome=outcome) for outcome in ('accepted', 'rejected')}
+  await main.start_auction.callback(admin)
+  view = next(iter(session.active_auctions))
+  clock = SimClock()
+  view.bids.render_interval = render_interval
+  view.bids.clock = clock
+  view.bids.sleep = clock.sleep
+
+  # Bid latency is measured from the click to the moment the bid engine
+  # applies it; each click gets its own user object to key on.
+  clicked = {}
+  applied = []
+  apply_bid = view.apply_bid
+
+  def timed_apply_bid(user):
+      result = apply_bid(user)
+      applied.append(time.perf_counter() - clicked.pop(id(user)))
+      return result
+  view.apply_bid = timed_apply_bid
+
+  auctioneer = FakeUser(AUCTIONEER_ID)
+  await view.start_auction.callback(FakeInteraction(auctioneer, view.message, client))
+  callback, close = [], []
+  lots = bids = 0
+  calls_before = sum(CALLS.values())
+  started = time.perf_counter()
+  while view.current_player is not None:
+      lots += 1
+      for _ in range(rng.randint(0, bids_per_lot)):
+          user = FakeUser(rng.choice(users).id)
+          clicked[id(user)] = time.perf_counter()
+          await timed(callback, view.bid.callback(FakeInteraction(user, view.message, client)))
+          bids += 1
+          await clock.advance(rng.expovariate(10.0))
+      await clock.advance(0)
+      player = view.current_player
+      button = view.sold_player if view.highest_bidder_id is not None else view.next_player
+      await timed(close, button.callback(FakeInteraction(auctioneer, view.message, client)))
+      if view.is_finished():
+          break
+      if view.current_player is player:
+          raise RuntimeError(f"{button.label} did not close the lot for {player['name']}")
+  auction_seconds = time.perf_counter() - started
+  auction_calls = sum(CALLS.values()) - calls_before
+
+  trade_latency = []
+  rostered = [name for name in session.player_index]
+  for _ in range(min(trades, len(rostered))):
+      player = rng.choice(rostered)
+      from_team = session.player_index[player]
+      to_team = f"Team {rng.choice(users).id}"
+      await timed(trade_latency, main.trade.callback(admin, from_team, to_team, player))
+
+  flush_started = time.perf_counter()
+  session.store.flush()
+  flush_seconds = time.perf_counter() - flush_started
+  session.store.close()
+  engine = {outcome: main.METRICS.counter('bids_total', outcome=outcome) - before for outcome, before in outcomes.items()}
+
+  return {
+      'players': len(added),
+      'lots': lots,
+      'bidders': bidders,
+      'bids': {
+          'submitted': bids,
+          'accepted': engine['accepted'],
+          'rejected': engine['rejected'],
+          'per_sec': round(bids / auction_seconds, 1) if auction_seconds else 0.0,
+      },
+      'sold': sum(len(team.players) for team in session.teams.values()),
+      'unsold': len(session.unsold_players),
+      'latency': {
+          'bid_callback': latency_summary(callback),
+          'bid_applied': latency_summary(applied),
+          'lot_close': latency_summary(close),
+          'setup_command': latency_summary(setup),
+          'view_auction_players': latency_summary(browse),
+          'trade': latency_summary(trade_latency),
+      },
+      'persistence': {
+          'events': store_stats['events'],
+          'batches': store_stats['batches'],
+          'ms_per_event': round(store_stats['seconds'] * 1000 / max(1, store_stats['events']), 4),
+          'final_flush_ms': round(flush_seconds * 1000, 4),
+      },
+      'api_calls': {
+          'total': dict(sorted(CALLS.items())),
+          'per_lot': round(auction_calls / max(1, lots), 3),
+          'message_edits_per_lot': round(CALLS['message.edit'] / max(1, lots), 3),
+      },
+  }
+
+
+async def run(files, bidders, bids_per_lot, trades, seed, render_interval):
+  results = {}
+  for name in files:
+      path = os.path.abspath(name if os.path.exists(name) else os.path.join(HERE, name))
+      with tempfile.TemporaryDirectory() as scratch:
+          cwd = os.getcwd()
+          os.chdir(scratch)
+          try:
+              results[os.path.basename(name)] = await run_scenario(path, bidders, bids_per_lot, trades, seed, render_interval)
+          finally:
+              os.chdir(cwd)
+  return results
+
+
+#############################################################
+# Lot timers:
+#############################################################
+async def run_timers(count, seed):
+  # Microbenchmark for main.TimerScheduler on the real clock: `count` lots
+  # each get a close timer within the next half second, half of them are
+  # extended once by a late bid and a tenth are closed early (cancelled).
+  rng = random.Random(seed)
+  scheduler = main.TimerScheduler()
+  keys = list(range(count))
+  fired = []
+  schedule_samples = []
+
+  def fire(key, due):
+      fired.append(scheduler.clock() - due)
+
+  def schedule(key, delay):
+      due = scheduler.clock() + delay
+      started = time.perf_counter()
+      scheduler.schedule(key, due, lambda: fire(key, due))
+      schedule_samples.append(time.perf_counter() - started)
+
+  tasks_before = len(asyncio.all_tasks())
+  for key in keys:
+      schedule(key, rng.uniform(0.2, 0.5))
+  pending = len(scheduler)
+  tasks = len(asyncio.all_tasks()) - tasks_before
+  for key in rng.sample(keys, count // 2):
+      schedule(key, rng.uniform(0.4, 0.6))
+  cancelled = rng.sample(keys, count // 10)
+  for key in cancelled:
+      scheduler.cancel(key)
+  while len(scheduler):
+      await asyncio.sleep(0.05)
+  await asyncio.sleep(0.01)
+  return {
+      'timers': count,
+      'pending_peak': pending,
+      'scheduler_tasks': tasks,
+      'fired': len(fired),
+      'cancelled': len(cancelled),
+      'schedule': latency_summary(schedule_samples),
+      'fire_lateness': latency_summary(fired),
+  }
+
+
+#############################################################
+# Roster planner:
+#############################################################
+def run_planner(size, seed):
+  # Microbenchmark for main.plan_roster: pools of `size` players drawn from
+  # the combined pool's categories and base prices ('tiered'), and the worst
+  # case of nearly every price distinct ('varied'), planned for a spread of
+  # purses, open slots and category needs at predicted prices.
+  rng = random.Random(seed)
+  with open(os.path.join(HERE, 'combined_auction.json')) as f:
+      source = json.load(f)['players_for_auction']
+  premiums = {'Batsmen': 0.8, 'Allrounders': 0.5, 'Bowlers': 0.3}
+  pools = {
+      'tiered': [dict(rng.choice(source), name=f"Player {i}") for i in range(size)],
+      'varied': [{'name': f"Player {i}", 'category': rng.choice(main.CATEGORIES),
+                  'base_price': rng.randrange(20000, 400000, 1000)} for i in range(size)],
+  }
+  report = {'players': size}
+  for kind, pool in pools.items():
+      samples, exact = [], 0
+      for _ in range(20):
+          needs = {category: rng.randint(0, 3) for category in rng.sample(main.CATEGORIES, 2)}
+          started = time.perf_counter()
+          plan = main.plan_roster(pool, rng.randint(1, main.MAX_TEAM_SIZE), rng.randrange(200000, main.MAX_PURSE + 1, 10000), needs, premiums)
+          samples.append(time.perf_counter() - started)
+          exact += plan is None or plan[3]
+      report[kind] = {'plan': latency_summary(samples), 'proven_best': exact}
+  return report
+
+
+#############################################################
+# Cold start:
+#############################################################
+def run_startup(repeats):
+  # Import time of main.py in fresh interpreters, and loading the repo's
+  # league (plus the combined pool, for size) from the pickle snapshot
+  # versus the JSON one.
+  imports = []
+  env = dict(os.environ, TOKEN='bench')
+  for _ in range(repeats):
+      output = subprocess.run(
+          [sys.executable, '-c', 'import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)'],
+          cwd=HERE, env=env, capture_output=True, text=True, check=True).stdout
+      imports.append(float(output.split()[-1]))
+
+  with open(os.path.join(HERE, 'auction_data.json')) as f:
+      data = json.load(f)
+  with open(os.path.join(HERE, 'combined_auction.json')) as f:
+      data['players_for_auction'] = json.load(f)['players_for_auction']
+  loads = {'pickle': [], 'json': []}
+  with tempfile.TemporaryDirectory() as scratch:
+      journal = main.EventJournal(os.path.join(scratch, main.DATA_FILE), os.path.join(scratch, main.JOURNAL_FILE), main.SNAPSHOT_EVERY)
+      journal.state_fn = lambda: data
+      journal.start()
+      journal.compact()
+      journal.close()
+      sizes = {'json': os.path.getsize(journal.snapshot_path), 'pickle': os.path.getsize(journal.binary_path)}
+      now = time.time()
+      for _ in range(repeats):
+          for kind, newer, older in (('pickle', journal.binary_path, journal.snapshot_path),
+                                     ('json', journal.snapshot_path, journal.binary_path)):
+              # The store reads the pickle unless the JSON is newer.
+              os.utime(older, (now, now))
+              os.utime(newer, (now + 1, now + 1))
+              started = time.perf_counter()
+              journal.load()
+              loads[kind].append(time.perf_counter() - started)
+  return {
+      'import_main': latency_summary(imports),
+      'load_snapshot': {kind: latency_summary(samples) for kind, samples in loads.items()},
+      'snapshot_bytes': sizes,
+  }
+
+
+#############################################################
+# Comparing runs:
+#############################################################
+def flatten(tree, prefix=''):
+  for key, value in tree.items():
+      if isinstance(value, dict):
+          yield from flatten(value, f"{prefix}{key}.")
+      else:
+          yield f"{prefix}{key}", value
+
+def compare(before, after):
+  sections = ('scenarios', 'lot_timers', 'planner', 'startup')
+  old = dict(flatten({section: before.get(section, {}) for section in sections}))
+  new = dict(flatten({section: after.get(section, {}) for section in sections}))
+  for key in sorted(old.keys() | new.keys()):
+      a, b = old.get(key), new.get(key)
+      if a == b:
+          continue
+      if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a:
+          print(f"{key}: {a} -> {b} ({(b - a) / a:+.1%})")
+      else:
+          print(f"{key}: {a} -> {b}")
+
+
+def parse_args(argv):
+  parser = argparse.ArgumentParser(description='Offline load test for the auction bot.')
+  parser.add_argument('files', nargs='*', help='player files to auction (default: combined + every round file)')
+  parser.add_argument('-b', '--bidders', type=int, default=300)
+  parser.add_argument('-n', '--bids-per-lot', type=int, default=40, help='upper bound of bids per lot')
+  parser.add_argument('-t', '--trades', type=int, default=50)
+  parser.add_argument('-s', '--seed', type=int, default=1)
+  parser.add_argument('--render-interval', type=float, default=main.BID_RENDER_INTERVAL)
+  parser.add_argument('--timers', type=int, default=5000, help='lot timers for the scheduler microbenchmark (0 skips it)')
+  parser.add_argument('--planner', type=int, default=5000, help='pool size for the roster planner microbenchmark (0 skips it)')
+  parser.add_argument('--startup', type=int, default=5, help='cold imports and snapshot loads to time (0 skips them)')
+  parser.add_argument('-o', '--output', help='write the JSON report here instead of stdout')
+  parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='diff two saved reports')
+  return parser.parse_args(argv)
+
+def main_cli(argv=None):
+  args = parse_args(argv)
+  if args.compare:
+      with open(args.compare[0]) as f, open(args.compare[1]) as g:
+          compare(json.load(f), json.load(g))
+      return
+  files = args.files or DEFAULT_FILES
+  report = {
+      'config': {
+          'files': files,
+          'bidders': args.bidders,
+          'bids_per_lot': args.bids_per_lot,
+          'trades': args.trades,
+          'seed': args.seed,
+          'render_interval': args.render_interval,
+          'storage_backend': main.STORAGE_BACKEND,
+          'python': sys.version.split()[0],
+      },
+      'scenarios': asyncio.run(run(files, args.bidders, args.bids_per_lot, args.trades, args.seed, args.render_interval)),
+  }
+  if args.timers:
+      report['lot_timers'] = asyncio.run(run_timers(args.timers, args.seed))
+  if args.planner:
+      report['planner'] = run_planner(args.planner, args.seed)
+  if args.startup:
+      report['startup'] = run_startup(args.startup)
+  text = json.dumps(report, indent=2, sort_keys=True)
+  if args.output:
+      with open(args.output, 'w') as f:
+          f.write(text + '\n')
+  else:
+      print(text)
+
+
+if __name__ == '__main__':
+  main_cli()
@@ -1,13 +1,30 @@
 import os
+import sys
+import time
+PROCESS_START = time.monotonic()  # startup phases are measured from here
+import glob
 
 import discord
 from discord.ext import commands, tasks
 from discord.ui import Button, View
 import asyncio
 import json
-import openpyxl
-from openpyxl import load_workbook
-import pprint
+import csv
+import io
+import itertools
+from collections import OrderedDict, Counter
+import queue
+import threading
+import atexit
+import bisect
+import heapq
+import math
+from array import array
+import functools
+import logging
+import re
+import shlex
+import pickle
 
 
 #############################################################
@@ -49,6 +66,357 @@ class CustomHelp(commands.HelpCommand):
 
 
 
+#############################################################
+# Player catalog:
+#############################################################
+# Canonical categories are the ones add_player_for_auction accepts; the
+# round files use the singular spellings, which map onto them.
+CATEGORIES = ["Batsmen", "Allrounders", "Bowlers"]
+CATEGORY_ALIASES = {
+    'batsman': 'Batsmen', 'batsmen': 'Batsmen', 'batter': 'Batsmen', 'batters': 'Batsmen',
+    'allrounder': 'Allrounders', 'allrounders': 'Allrounders', 'all-rounder': 'Allrounders',
+    'all-rounders': 'Allrounders', 'all rounder': 'Allrounders', 'all rounders': 'Allrounders',
+    'bowler': 'Bowlers', 'bowlers': 'Bowlers',
+}
+
+# (minimum base price, bid increment), highest tier first.
+PRICE_TIERS = [(200000, 50000), (150000, 30000), (100000, 20000), (0, 10000)]
+
+
+def normalize_category(category):
+    return CATEGORY_ALIASES.get(str(category).strip().lower(), category)
+
+def price_tier(base_price):
+    # The floor of the tier a base price falls in (200000, 150000, 100000 or 0).
+    for floor, _ in PRICE_TIERS:
+        if base_price >= floor:
+            return floor
+    return 0
+
+def bid_increment(base_price):
+    for floor, increment in PRICE_TIERS:
+        if base_price >= floor:
+            return increment
+    return PRICE_TIERS[-1][1]
+
+
+# Shared source of version numbers, so a version is never reused even when a
+# catalog or team is replaced (e.g. on reload).
+_VERSIONS = itertools.count(1)
+
+
+class PlayerCatalog:
+    """Ordered pool of players keyed by name.
+
+    Dequeueing the next player, appending and removing by name are all O(1).
+    Players are also indexed by normalized category and base-price tier.
+    Serializes to the same list-of-dicts shape the data files use.
+    """
+
+    def __init__(self, players=()):
+        self._players = OrderedDict()
+        self._by_category = {}
+        self._by_tier = {}
+        # Bumped on every change so caches built from the pool know when to rebuild.
+        self.version = next(_VERSIONS)
+        self.extend(players)
+
+    def __len__(self):
+        return len(self._players)
+
+    def __iter__(self):
+        return iter(self._players.values())
+
+    def __contains__(self, name):
+        return name in self._players
+
+    def get(self, name):
+        return self._players.get(name)
+
+    def peek(self):
+        # The next player up, without removing them.
+        return next(iter(self._players.values()), None)
+
+    def append(self, player):
+        name = player['name']
+        if name in self._players:
+            return False
+        self._players[name] = player
+        self._by_category.setdefault(normalize_category(player.get('category')), {})[name] = None
+        self._by_tier.setdefault(price_tier(player.get('base_price', 0)), {})[name] = None
+        self.version = next(_VERSIONS)
+        return True
+
+    def extend(self, players):
+        # Returns how many players were new to the pool.
+        return sum(1 for player in players if self.append(player))
+
+    def popleft(self):
+        name, player = self._players.popitem(last=False)
+        self._unindex(player)
+        return player
+
+    def remove(self, name):
+        player = self._players.pop(name, None)
+        if player is not None:
+            self._unindex(player)
+        return player
+
+    def clear(self):
+        self._players.clear()
+        self._by_category.clear()
+        self._by_tier.clear()
+        self.version = next(_VERSIONS)
+
+    def by_category(self, category):
+        names = self._by_category.get(normalize_category(category), {})
+        return [self._players[name] for name in names]
+
+    def by_tier(self, base_price):
+        names = self._by_tier.get(price_tier(base_price), {})
+        return [self._players[name] for name in names]
+
+    def to_list(self):
+        return list(self._players.values())
+
+    def _unindex(self, player):
+        name = player['name']
+        self._by_category.get(normalize_category(player.get('category')), {}).pop(name, None)
+        self._by_tier.get(price_tier(player.get('base_price', 0)), {}).pop(name, None)
+        self.version = next(_VERSIONS)
+
+
+
+
+#############################################################
+# Sale ledger:
+#############################################################
+TOP_BUYS = 10
+
+
+class SaleLedger:
+    """Columnar log of every closed lot, with running aggregates.
+
+    One row per lot in parallel typed arrays (team -1 marks an unsold lot).
+    record() updates the per-team and per-category totals and the top-buys
+    heap as it appends, so the analytics never rescan the history.
+    """
+
+    COLUMNS = ('player', 'team', 'category', 'price', 'base_price', 'bids', 'bidders', 'ts')
+
+    def __init__(self):
+        self.player = []
+        self.team = array('l')       # index into team_names, -1 if unsold
+        self.category = array('b')   # index into CATEGORIES, -1 if unknown
+        self.price = array('q')
+        self.base_price = array('q')
+        self.bids = array('l')
+        self.bidders = array('l')
+        self.ts = array('d')
+        self.team_names = []
+        self._team_ids = {}
+        # team -> [spent, players bought]
+        self.team_spend = {}
+        # category -> [sold, unsold, total price, total base price, max price, max player]
+        self.category_stats = {category: [0, 0, 0, 0, 0, None] for category in CATEGORIES + ['Other']}
+        self._top = []  # min-heap of (price, row) holding the TOP_BUYS dearest sales
+
+    def __len__(self):
+        return len(self.price)
+
+    def record(self, player, team, category, price, base_price, bids=0, bidders=0, ts=0.0):
+        # team is None for an unsold lot.
+        row = len(self.price)
+        category = normalize_category(category)
+        category_id = CATEGORIES.index(category) if category in CATEGORIES else -1
+        if team is None:
+            team_id = -1
+        else:
+            team_id = self._team_ids.get(team)
+            if team_id is None:
+                team_id = self._team_ids[team] = len(self.team_names)
+                self.team_names.append(team)
+        self.player.append(player)
+        self.team.append(team_id)
+        self.category.append(category_id)
+        self.price.append(price)
+        self.base_price.append(base_price)
+        self.bids.append(bids)
+        self.bidders.append(bidders)
+        self.ts.append(ts)
+
+        stats = self.category_stats[CATEGORIES[category_id] if category_id >= 0 else 'Other']
+        if team is None:
+            stats[1] += 1
+            return
+        spend = self.team_spend.setdefault(team, [0, 0])
+        spend[0] += price
+        spend[1] += 1
+        stats[0] += 1
+        stats[2] += price
+        stats[3] += base_price
+        if price > stats[4]:
+            stats[4], stats[5] = price, player
+        if len(self._top) < TOP_BUYS:
+            heapq.heappush(self._top, (price, row))
+        elif price > self._top[0][0]:
+            heapq.heapreplace(self._top, (price, row))
+
+    def top_buys(self, n=TOP_BUYS):
+        # [(player, team, price, base_price)], dearest first.
+        return [(self.player[row], self.team_names[self.team[row]], self.price[row], self.base_price[row])
+                for price, row in sorted(self._top, reverse=True)[:n]]
+
+    def row(self, index):
+        team_id = self.team[index]
+        category_id = self.category[index]
+        return {
+            'player': self.player[index],
+            'team': self.team_names[team_id] if team_id >= 0 else None,
+            'category': CATEGORIES[category_id] if category_id >= 0 else None,
+            'price': self.price[index],
+            'base_price': self.base_price[index],
+            'bids': self.bids[index],
+            'bidders': self.bidders[index],
+            'ts': self.ts[index],
+        }
+
+    def to_columns(self):
+        # Column lists for the JSON snapshot; team and category by name.
+        columns = {name: [] for name in self.COLUMNS}
+        for index in range(len(self)):
+            for name, value in self.row(index).items():
+                columns[name].append(value)
+        return columns
+
+    @classmethod
+    def from_columns(cls, columns):
+        ledger = cls()
+        if columns:
+            for values in zip(*(columns[name] for name in cls.COLUMNS)):
+                ledger.record(*values)
+        return ledger
+
+
+#############################################################
+# Purse ledger:
+#############################################################
+# Each owner has one balance, whatever team they run; a team's purse is its
+# owner's balance. IDs are normalized to str on the way in, so the int IDs
+# discord.py hands out and the str IDs read back from JSON or SQLite find
+# the same record.
+
+
+class OwnerRecord:
+    __slots__ = ('id', 'balance', 'reserved')
+
+    def __init__(self, owner_id, balance=0):
+        self.id = owner_id
+        self.balance = balance
+        # High bids this owner currently leads, summed across open lots.
+        self.reserved = 0
+
+
+class TeamRecord:
+    __slots__ = ('name', 'owner', 'max_size', 'players', 'account')
+
+    def __init__(self, name, account, max_size, players=()):
+        self.name = name
+        self.owner = account.id
+        self.max_size = max_size
+        self.players = list(players)
+        self.account = account
+
+    @property
+    def purse(self):
+        return self.account.balance
+
+    def is_full(self):
+        return len(self.players) >= self.max_size
+
+    def to_dict(self):
+        return {'owner': self.owner, 'max_size': self.max_size, 'players': self.players}
+
+
+class PurseLedger:
+    """Every owner's balance, the high bids held against them, and an audit trail.
+
+    Each change of balance is appended to audit as (ts, owner, kind,
+    amount, reason), kind being 'set' (amount is the new balance) or
+    'debit', so replaying the trail must reproduce the balances; load
+    checks that with discrepancies(). Holds are in memory only: an open lot
+    reserves its high bid against the leader, so the same money cannot
+    lead two lots at once.
+    """
+
+    def __init__(self):
+        self.owners = {}
+        self.audit = []
+        self._holds = {}  # hold (an open lot) -> (owner id, amount)
+
+    def __contains__(self, owner_id):
+        return str(owner_id) in self.owners
+
+    def __len__(self):
+        return len(self.owners)
+
+    def account(self, owner_id):
+        # The owner's record, opened at 0 if they have none yet.
+        owner_id = str(owner_id)
+        record = self.owners.get(owner_id)
+        if record is None:
+            record = self.owners[owner_id] = OwnerRecord(owner_id)
+        return record
+
+    def balance(self, owner_id):
+        record = self.owners.get(str(owner_id))
+        return record.balance if record is not None else 0
+
+    def available(self, owner_id, hold=None):
+        # Balance less the high bids the owner leads, except the one on hold.
+        record = self.owners.get(str(owner_id))
+        if record is None:
+            return 0
+        held_owner, held_amount = self._holds.get(hold, (None, 0))
+        return record.balance - record.reserved + (held_amount if held_owner == record.id else 0)
+
+    def can_afford(self, owner_id, amount, hold=None):
+        return str(owner_id) in self.owners and self.available(owner_id, hold) >= amount
+
+    def reserve(self, hold, owner_id, amount):
+        # Moves hold's reservation to owner_id; the owner must have an account.
+        self.release(hold)
+        record = self.owners[str(owner_id)]
+        record.reserved += amount
+        self._holds[hold] = (record.id, amount)
+
+    def release(self, hold):
+        held = self._holds.pop(hold, None)
+        if held is not None and held[0] in self.owners:
+            self.owners[held[0]].reserved -= held[1]
+
+    def set_balance(self, owner_id, amount, reason, ts=0.0):
+        record = self.account(owner_id)
+        record.balance = amount
+        self.audit.append((ts, record.id, 'set', amount, reason))
+
+    def debit(self, owner_id, amount, reason, ts=0.0):
+        record = self.owners[str(owner_id)]
+        record.balance -= amount
+        self.audit.append((ts, record.id, 'debit', amount, reason))
+
+    def discrepancies(self):
+        # owner id -> (balance, balance per the audit trail or None) for every
+        # owner the trail does not account for.
+        audited = {}
+        for _, owner_id, kind, amount, _ in self.audit:
+            audited[owner_id] = amount if kind == 'set' else audited.get(owner_id, 0) - amount
+        return {owner_id: (record.balance, audited.get(owner_id))
+                for owner_id, record in self.owners.items() if audited.get(owner_id) != record.balance}
+
+
+
+
 #############################################################
 # Declarations:
 #############################################################
@@ -61,270 +429,2711 @@ intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 bot.help_command = CustomHelp()
 
-TEAMS = {}  
-PLAYERS_FOR_AUCTION = []  
-UNSOLD_PLAYERS = []
 MAX_TEAM_SIZE = 18
-USERS = {}  
 MAX_PURSE = 20000000
-AUCTION_CHANNEL = None
 auctioneer_id = 256972361918578688  
+# Default auctioneers for a new league; each league keeps its own set.
 AUTHORIZED_USER_IDS = {'256972361918578688', '1111497896018313268'}
 
 
 
 
+#############################################################
+# Logging & metrics:
+#############################################################
+# Leveled logging replaces the old prints; chatty hot-path messages go
+# through log_sampled so a busy auction cannot flood the console.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+WEB_HOST = os.environ.get('WEB_HOST', '127.0.0.1')
+WEB_PORT = int(os.environ.get('WEB_PORT', 8080))  # 0 disables the HTTP server
+LOOP_LAG_INTERVAL = float(os.environ.get('LOOP_LAG_INTERVAL', 1.0))
+
+log = logging.getLogger('auction')
+log.setLevel(LOG_LEVEL)
+if not log.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('[{asctime}] [{levelname:<8}] {name}: {message}', '%Y-%m-%d %H:%M:%S', style='{'))
+    log.addHandler(_log_handler)
+_log_samples = Counter()
+
+
+def log_sampled(level, key, message, *args):
+  # Logs the first occurrence of key and then one in every LOG_SAMPLE_EVERY.
+  _log_samples[key] += 1
+  seen = _log_samples[key]
+  if seen == 1 or seen % LOG_SAMPLE_EVERY == 0:
+      log.log(level, message + " (seen %d times)", *args, seen)
+
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+  def __init__(self, buckets):
+      self.buckets = buckets
+      self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+      self.sum = 0.0
+      self.count = 0
+
+  def observe(self, value):
+      self.counts[bisect.bisect_left(self.buckets, value)] += 1
+      self.sum += value
+      self.count += 1
+
+
+class Metrics:
+  """Counters, gauges and histograms rendered in Prometheus text format.
+
+  Updated from the event loop and the store writer threads and read by the
+  HTTP thread, so every access goes through one lock. Gauges registered with
+  gauge_fn are computed when scraped.
+  """
+
+  def __init__(self):
+      self._lock = threading.Lock()
+      self._help = {}
+      self._counters = {}
+      self._gauges = {}
+      self._histograms = {}
+      self._gauge_fns = {}
+
+  def describe(self, name, kind, text):
+      self._help[name] = (kind, text)
+
+  def inc(self, name, amount=1, **labels):
+      key = (name, tuple(sorted(labels.items())))
+      with self._lock:
+          self._counters[key] = self._counters.get(key, 0) + amount
+
+  def counter(self, name, **labels):
+      with self._lock:
+          return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+  def set_gauge(self, name, value, **labels):
+      with self._lock:
+          self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+  def gauge_fn(self, name, fn):
+      self._gauge_fns[name] = fn
+
+  def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+      key = (name, tuple(sorted(labels.items())))
+      with self._lock:
+          histogram = self._histograms.get(key)
+          if histogram is None:
+              histogram = self._histograms[key] = Histogram(buckets)
+          histogram.observe(value)
+
+  def render(self):
+      series = {}
+      with self._lock:
+          for (name, labels), value in self._counters.items():
+              series.setdefault(name, []).append((name, labels, value))
+          for (name, labels), value in self._gauges.items():
+              series.setdefault(name, []).append((name, labels, value))
+          for (name, labels), histogram in self._histograms.items():
+              samples = series.setdefault(name, [])
+              cumulative = 0
+              for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                  cumulative += count
+                  le = '+Inf' if bound == float('inf') else repr(bound)
+                  samples.append((name + '_bucket', labels + (('le', le),), cumulative))
+              samples.append((name + '_sum', labels, histogram.sum))
+              samples.append((name + '_count', labels, histogram.count))
+      for name, fn in self._gauge_fns.items():
+          try:
+              series[name] = [(name, (), fn())]
+          except Exception as e:
+              log.warning("Gauge %s failed: %s", name, e)
+      lines = []
+      for name in sorted(series):
+          kind, text = self._help.get(name, ('untyped', ''))
+          lines.append(f"# HELP {name} {text}")
+          lines.append(f"# TYPE {name} {kind}")
+          for sample, labels, value in series[name]:
+              lines.append(f"{sample}{_format_labels(labels)} {value}")
+      return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+  if not labels:
+      return ''
+  escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+  return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+METRICS = Metrics()
+METRICS.describe('command_latency_seconds', 'histogram', 'Time to run a bot command.')
+METRICS.describe('button_latency_seconds', 'histogram', 'Time to handle a button or select click.')
+METRICS.describe('bid_queue_seconds', 'histogram', 'Time from a bid click to the bid engine applying it.')
+METRICS.describe('bids_total', 'counter', 'Bids applied by the bid engine, by outcome (accepted or rejected).')
+METRICS.describe('bid_renders_coalesced_total', 'counter', 'Accepted bids shown by an auction message edit that was already due.')
+METRICS.describe('store_write_seconds', 'histogram', 'Time the store writer spends persisting one batch.')
+METRICS.describe('store_bytes_written_total', 'counter', 'Bytes handed to the store writer.')
+METRICS.describe('store_events_total', 'counter', 'League events persisted.')
+METRICS.describe('store_write_errors_total', 'counter', 'Store batches that failed to persist.')
+METRICS.describe('event_loop_lag_seconds', 'histogram', 'Delay before the event loop runs a ready task.')
+METRICS.describe('discord_requests_total', 'counter', 'Discord REST requests by call and route.')
+METRICS.describe('discord_rate_limits_total', 'counter', 'Rate-limit responses from Discord.')
+METRICS.describe('startup_seconds', 'gauge', 'Seconds from process start to each startup phase.')
+METRICS.describe('league_load_seconds', 'histogram', 'Time to load one league from its store.')
+
+# Seconds from PROCESS_START to each startup phase, the first time it is
+# reached: imported (main.py ran), on_ready (gateway connected) and usable
+# (open auctions re-attached and their leagues loaded).
+STARTUP = {}
+
+def mark_startup(phase):
+  if phase not in STARTUP:
+      STARTUP[phase] = time.monotonic() - PROCESS_START
+      METRICS.set_gauge('startup_seconds', round(STARTUP[phase], 3), phase=phase)
+  return STARTUP[phase]
+
+
+def timed_callback(name):
+  # Records the latency of a view button/select callback.
+  def decorate(func):
+      @functools.wraps(func)
+      async def wrapper(*args, **kwargs):
+          started = time.perf_counter()
+          try:
+              return await func(*args, **kwargs)
+          finally:
+              METRICS.observe('button_latency_seconds', time.perf_counter() - started, button=name)
+      return wrapper
+  return decorate
+
+
+@bot.before_invoke
+async def _start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def _record_command_latency(ctx):
+    # Runs after failed commands too.
+    started = getattr(ctx, 'started_at', None)
+    if started is not None:
+        status = 'error' if ctx.command_failed else 'ok'
+        METRICS.observe('command_latency_seconds', time.perf_counter() - started, command=ctx.command.qualified_name, status=status)
+
+
+# Every REST request discord.py makes, including interaction responses and
+# followups sent through webhooks, is counted by call and route template.
+_INTERACTION_CALLS = {4: 'send_message', 5: 'defer', 6: 'defer', 7: 'edit_message', 9: 'send_modal'}
+_API_CALLS = {
+    'GET /users/{user_id}': 'fetch_user',
+    'PATCH /channels/{channel_id}/messages/{message_id}': 'edit_message',
+    'POST /channels/{channel_id}/messages': 'send_message',
+    'POST /webhooks/{webhook_id}/{webhook_token}': 'followup',
+}
+
+
+def _api_call_name(route, payload):
+  if route.path.endswith('/callback'):
+      return _INTERACTION_CALLS.get((payload or {}).get('type'), 'interaction_response')
+  return _API_CALLS.get(route.key, 'other')
+
+def _count_requests(client_class):
+  original = client_class.request
+
+  async def counted_request(self, route, *args, **kwargs):
+      METRICS.inc('discord_requests_total', call=_api_call_name(route, kwargs.get('payload')), route=route.key)
+      return await original(self, route, *args, **kwargs)
+  client_class.request = counted_request
+
+_count_requests(discord.http.HTTPClient)
+_count_requests(discord.webhook.async_.AsyncWebhookAdapter)
+
+
+class _RateLimitCounter(logging.Filter):
+  # discord.py retries 429s itself and only logs them, so count the logs.
+  def filter(self, record):
+      if record.levelno >= logging.WARNING and ('rate limited' in record.msg or '429' in record.msg):
+          METRICS.inc('discord_rate_limits_total', source=record.name)
+      return True
+
+for _logger_name in ('discord.http', 'discord.webhook.async_'):
+    logging.getLogger(_logger_name).addFilter(_RateLimitCounter())
+
+
+@tasks.loop(seconds=LOOP_LAG_INTERVAL)
+async def measure_loop_lag():
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.sleep(0)
+    METRICS.observe('event_loop_lag_seconds', loop.time() - started)
+
+
+# Routes are collected here and bound to a Flask app by web_app(), so flask
+# is only imported once the web server starts (on its own thread).
+WEB_ROUTES = []
+
+def web_route(*rules):
+  def register(view):
+      WEB_ROUTES.append((rules, view))
+      return view
+  return register
+
+@functools.lru_cache(maxsize=None)
+def web_app():
+  from flask import Flask
+  app = Flask(__name__)
+  for rules, view in WEB_ROUTES:
+      for rule in rules:
+          app.add_url_rule(rule, view_func=view)
+  return app
+
+@web_route('/metrics')
+def metrics_endpoint():
+    from flask import Response
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+def start_web_server():
+  # Flask's threaded server runs on its own daemon thread, off the gateway loop.
+  if not WEB_PORT:
+      return
+  thread = threading.Thread(
+      target=lambda: web_app().run(host=WEB_HOST, port=WEB_PORT, threaded=True, use_reloader=False),
+      name='web', daemon=True)
+  thread.start()
+  log.info("Serving metrics on http://%s:%d/metrics", WEB_HOST, WEB_PORT)
+
+
 #############################################################
 # Data Management:
 #############################################################
-def save_data():
-  # This function saves the current state of players and teams to a file
-  data = {
-      "players_for_auction": PLAYERS_FOR_AUCTION,
-      "teams": TEAMS,
-      "unsold": UNSOLD_PLAYERS,
-      "users": USERS
-  }
-  with open('auction_data.json', 'w') as f:
-      json.dump(data, f, indent=4)
+# State is persisted by a store selected at startup with STORAGE_BACKEND:
+#   json   - a snapshot (auction_data.json) plus an append-only journal with
+#            one line per mutation, folded back into the snapshot every
+#            SNAPSHOT_EVERY events. Each snapshot is also written as a
+#            pickle (auction_data.pickle), which loads faster; the JSON stays
+#            the portable copy and wins if it is newer (edited by hand).
+#   sqlite - auction.db (WAL mode) with one table per kind of league state;
+#            every event is written as its own small transaction.
+# Every change to a league's state goes through LeagueSession.commit(), which
+# applies the event in memory and hands it to the store's writer thread, so
+# the event loop never waits on disk.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+DATA_FILE = 'auction_data.json'
+BINARY_DATA_FILE = 'auction_data.pickle'
+JOURNAL_FILE = 'auction_journal.jsonl'
+LOT_FILE = 'current_lot.json'
+DB_FILE = 'auction.db'
+SNAPSHOT_EVERY = int(os.environ.get('SNAPSHOT_EVERY', 200))
+
+
+def _payload_size(payload):
+  if isinstance(payload, (str, bytes)):
+      return len(payload)
+  if isinstance(payload, tuple):
+      return sum(map(_payload_size, payload))
+  return len(json.dumps(payload))
+
+
+class BackgroundStore:
+  def __init__(self):
+      self.seq = 0
+      # Returns the full state to snapshot; set by the owning LeagueSession.
+      self.state_fn = None
+      self._queue = queue.Queue()
+      self._thread = None
+
+  def start(self):
+      if self._thread is None:
+          self._thread = threading.Thread(target=self._run, name=f'{type(self).__name__}-writer', daemon=True)
+          self._thread.start()
+
+  def append(self, event):
+      # Called on the event loop: only encodes the (small) event record.
+      self.seq += 1
+      event['seq'] = self.seq
+      self._queue.put(('event', self._encode(event)))
+
+  def compact(self, data=None):
+      pass
+
+  def save_lot(self, message_id, lot):
+      # Checkpoint the lot open on one auction message (or None once it
+      # closes). Each auction message has its own checkpoint.
+      self._queue.put(('lot', (str(message_id), None if lot is None else json.dumps(lot))))
+
+  def flush(self):
+      # Blocks until everything queued so far is on disk.
+      if self._thread is not None:
+          self._queue.join()
+
+  def close(self):
+      if self._thread is not None:
+          self._queue.put(('stop', None))
+          self._thread.join()
+          self._thread = None
+
+  def _encode(self, event):
+      return event
+
+  def _record_write(self, batch, seconds):
+      backend = type(self).__name__
+      written = sum(_payload_size(payload) for kind, payload in batch if payload is not None)
+      METRICS.observe('store_write_seconds', seconds, backend=backend)
+      METRICS.inc('store_bytes_written_total', written, backend=backend)
+      METRICS.inc('store_events_total', sum(1 for kind, _ in batch if kind == 'event'), backend=backend)
+
+  def _run(self):
+      self._open()
+      try:
+          while True:
+              kind, payload = self._queue.get()
+              # Drain whatever else is already queued so a burst of clicks
+              # costs one write + flush instead of one per event.
+              batch = [(kind, payload)]
+              while kind in ('event', 'lot') and not self._queue.empty():
+                  kind, payload = self._queue.get()
+                  batch.append((kind, payload))
+              started = time.perf_counter()
+              try:
+                  self._write(batch)
+                  self._record_write(batch, time.perf_counter() - started)
+              except Exception:
+                  # Keep writing later batches (a full disk may clear up);
+                  # the next snapshot carries whatever this one lost.
+                  log.exception("%s failed to write %d records", type(self).__name__, len(batch))
+                  METRICS.inc('store_write_errors_total', backend=type(self).__name__)
+              finally:
+                  for _ in batch:
+                      self._queue.task_done()
+              if kind == 'stop':
+                  return
+      finally:
+          self._close()
+
+
+class EventJournal(BackgroundStore):
+  def __init__(self, snapshot_path, journal_path, snapshot_every):
+      super().__init__()
+      self.snapshot_path = snapshot_path
+      self.journal_path = journal_path
+      self.lot_path = os.path.join(os.path.dirname(snapshot_path), LOT_FILE)
+      self.binary_path = os.path.join(os.path.dirname(snapshot_path), BINARY_DATA_FILE)
+      self.snapshot_every = snapshot_every
+      self.pending_since_snapshot = 0
+      self._journal = None
+      self._lots = {}  # message id -> encoded lot, as last written
+
+  def load(self):
+      # Returns the snapshot dict and the journal events recorded after it.
+      data = self._load_binary()
+      if data is None:
+          try:
+              with open(self.snapshot_path, 'r') as f:
+                  data = json.load(f)
+          except FileNotFoundError:
+              data = {}
+      snapshot_seq = data.get('seq', 0)
+      events = []
+      try:
+          with open(self.journal_path, 'rb') as f:
+              lines = f.readlines()
+          good_bytes = 0
+          for number, line in enumerate(lines, start=1):
+              try:
+                  event = json.loads(line)
+              except json.JSONDecodeError as e:
+                  if number < len(lines):
+                      # Valid events may follow; never drop them silently.
+                      raise ValueError(f"{self.journal_path} line {number} is corrupt ({e}); "
+                                       f"fix or remove it before starting the bot") from e
+                  # A torn final line from a crash mid-write: drop it so
+                  # new events are not appended after garbage.
+                  os.truncate(self.journal_path, good_bytes)
+                  break
+              good_bytes += len(line)
+              if event['seq'] > snapshot_seq:
+                  events.append(event)
+      except FileNotFoundError:
+          pass
+      self.seq = events[-1]['seq'] if events else snapshot_seq
+      self.pending_since_snapshot = len(events)
+      return data, events
+
+  def _load_binary(self):
+      # The pickle is written right after the JSON, so it is current unless
+      # the JSON was replaced since. Both are written only by this store.
+      try:
+          if os.path.getmtime(self.binary_path) < os.path.getmtime(self.snapshot_path):
+              return None
+      except FileNotFoundError:
+          if not os.path.exists(self.binary_path):
+              return None
+      try:
+          with open(self.binary_path, 'rb') as f:
+              return pickle.load(f)
+      except Exception as e:
+          log.warning("Could not read %s (%s); loading %s instead.", self.binary_path, e, self.snapshot_path)
+          return None
+
+  def load_lots(self):
+      # Reads only the small lot checkpoints, never the snapshot or journal.
+      try:
+          with open(self.lot_path, 'r') as f:
+              lots = json.load(f)
+      except (FileNotFoundError, json.JSONDecodeError):
+          lots = None
+      self._lots = {message_id: json.dumps(lot) for message_id, lot in (lots or {}).items()}
+      return {int(message_id): lot for message_id, lot in (lots or {}).items()}
+
+  def append(self, event):
+      super().append(event)
+      self.pending_since_snapshot += 1
+      if self.pending_since_snapshot >= self.snapshot_every:
+          self.compact()
+
+  def compact(self, data=None):
+      data = self.state_fn() if data is None else data
+      data['seq'] = self.seq
+      self._queue.put(('snapshot', (json.dumps(data, indent=4), pickle.dumps(data, pickle.HIGHEST_PROTOCOL))))
+      self.pending_since_snapshot = 0
+
+  def _encode(self, event):
+      return json.dumps(event, separators=(',', ':'))
+
+  def _open(self):
+      self._journal = open(self.journal_path, 'a')
+
+  def _close(self):
+      self._journal.close()
+
+  def _write(self, batch):
+      lines = [payload for kind, payload in batch if kind == 'event']
+      if lines:
+          end = self._journal.tell()
+          try:
+              self._journal.write('\n'.join(lines) + '\n')
+              self._journal.flush()
+          except OSError:
+              # Leave no partial line for later events to be appended to;
+              # load() refuses a corrupt line that is not the last.
+              self._journal.close()
+              os.truncate(self.journal_path, end)
+              self._journal = open(self.journal_path, 'a')
+              raise
+      lots = [payload for kind, payload in batch if kind == 'lot']
+      if lots:
+          for message_id, lot in lots:
+              if lot is None:
+                  self._lots.pop(message_id, None)
+              else:
+                  self._lots[message_id] = lot
+          tmp_path = self.lot_path + '.tmp'
+          with open(tmp_path, 'w') as f:
+              f.write('{' + ','.join(f'{json.dumps(message_id)}:{lot}' for message_id, lot in self._lots.items()) + '}')
+          os.replace(tmp_path, self.lot_path)
+      kind, payload = batch[-1]
+      if kind == 'snapshot':
+          text, binary = payload
+          tmp_path = self.snapshot_path + '.tmp'
+          with open(tmp_path, 'w') as f:
+              f.write(text)
+          os.replace(tmp_path, self.snapshot_path)
+          tmp_path = self.binary_path + '.tmp'
+          with open(tmp_path, 'wb') as f:
+              f.write(binary)
+          os.replace(tmp_path, self.binary_path)
+          # Everything up to the snapshot seq is now in the snapshot.
+          self._journal.close()
+          self._journal = open(self.journal_path, 'w')
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, purse INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS authorized (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS teams (
+    name TEXT PRIMARY KEY,
+    owner INTEGER NOT NULL,
+    max_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_teams_owner ON teams(owner);
+CREATE TABLE IF NOT EXISTS roster (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team TEXT NOT NULL REFERENCES teams(name),
+    player TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_roster_team ON roster(team);
+CREATE INDEX IF NOT EXISTS idx_roster_player ON roster(player);
+CREATE TABLE IF NOT EXISTS auction_queue (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    category TEXT,
+    base_price INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_queue_name ON auction_queue(name);
+CREATE INDEX IF NOT EXISTS idx_queue_category ON auction_queue(category);
+CREATE TABLE IF NOT EXISTS unsold (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    category TEXT,
+    base_price INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_unsold_name ON unsold(name);
+-- Unsold lots are sales rows with an empty team and owner and a price of 0.
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player TEXT NOT NULL,
+    team TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    sold_at REAL NOT NULL,
+    category TEXT,
+    base_price INTEGER,
+    bids INTEGER NOT NULL DEFAULT 0,
+    bidders INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sales_player ON sales(player);
+CREATE INDEX IF NOT EXISTS idx_sales_team ON sales(team);
+CREATE TABLE IF NOT EXISTS lots (message_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rounds (id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS proxies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    target TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    UNIQUE (owner, scope, target)
+);
+CREATE TABLE IF NOT EXISTS purse_audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    reason TEXT NOT NULL
+);
+"""
+
+
+def _sqlite_connect(path):
+  import sqlite3
+  conn = sqlite3.connect(path)
+  conn.execute('PRAGMA journal_mode=WAL')
+  conn.execute('PRAGMA synchronous=NORMAL')
+  conn.executescript(SQLITE_SCHEMA)
+  return conn
+
+
+def _audit_statement(ts, owner_id, kind, amount, reason):
+  return ('INSERT INTO purse_audit (ts, owner, kind, amount, reason) VALUES (?, ?, ?, ?, ?)',
+          (ts, str(owner_id), kind, amount, reason))
+
+
+def _sqlite_statements(event):
+  # Translate one journal event into the SQL that mirrors it.
+  op = event['op']
+  if op == 'set_purse':
+      return [('INSERT OR REPLACE INTO users (id, purse) VALUES (?, ?)', (str(event['user']), event['amount'])),
+              _audit_statement(event.get('ts', 0.0), event['user'], 'set', event['amount'], 'set_purse')]
+  if op == 'set_channel':
+      return [("INSERT OR REPLACE INTO meta (key, value) VALUES ('auction_channel', ?)", (event['channel'],))]
+  if op == 'authorize':
+      return [('INSERT OR IGNORE INTO authorized (id) VALUES (?)', (str(event['user']),))]
+  if op == 'deauthorize':
+      return [('DELETE FROM authorized WHERE id = ?', (str(event['user']),))]
+  if op == 'create_team':
+      return [
+          ('INSERT INTO teams (name, owner, max_size) VALUES (?, ?, ?)',
+           (event['team'], str(event['owner']), event['max_size'])),
+          ('INSERT INTO purse_audit (ts, owner, kind, amount, reason) SELECT ?, ?, ?, ?, ? '
+           'WHERE NOT EXISTS (SELECT 1 FROM users WHERE id = ?)',
+           (event.get('ts', 0.0), str(event['owner']), 'set', event['purse'], 'create_team', str(event['owner']))),
+          ('INSERT OR IGNORE INTO users (id, purse) VALUES (?, ?)', (str(event['owner']), event['purse'])),
+      ]
+  if op == 'reconcile_purses':
+      return [statement for owner_id, amount in event['balances'].items() for statement in (
+                  ('INSERT OR REPLACE INTO users (id, purse) VALUES (?, ?)', (owner_id, amount)),
+                  _audit_statement(event['ts'], owner_id, 'set', amount, 'reconcile'))]
+  if op == 'delete_team':
+      return [
+          ('DELETE FROM roster WHERE team = ?', (event['team'],)),
+          ('DELETE FROM teams WHERE name = ?', (event['team'],)),
+      ]
+  if op == 'add_player_to_team':
+      return [('INSERT INTO roster (team, player) VALUES (?, ?)', (event['team'], event['player']))]
+  if op == 'remove_player':
+      return [('DELETE FROM roster WHERE id = (SELECT MIN(id) FROM roster WHERE team = ? AND player = ?)',
+               (event['team'], event['player']))]
+  if op == 'trade':
+      return [
+          ('DELETE FROM roster WHERE id = (SELECT MIN(id) FROM roster WHERE team = ? AND player = ?)',
+           (event['from_team'], event['player'])),
+          ('INSERT INTO roster (team, player) VALUES (?, ?)', (event['to_team'], event['player'])),
+      ]
+  if op == 'add_auction_player':
+      player = event['player']
+      return [('INSERT INTO auction_queue (name, category, base_price) VALUES (?, ?, ?)',
+               (player['name'], player['category'], player['base_price']))]
+  if op == 'add_auction_players':
+      return [('INSERT INTO auction_queue (name, category, base_price) VALUES (?, ?, ?)',
+               (player['name'], player['category'], player['base_price'])) for player in event['players']]
+  if op == 'remove_auction_player':
+      return [('DELETE FROM auction_queue WHERE position = (SELECT MIN(position) FROM auction_queue WHERE name = ?)',
+               (event['name'],))]
+  if op == 'clear_auction':
+      return [('DELETE FROM auction_queue', ())]
+  if op == 'pop_player':
+      return [('DELETE FROM auction_queue WHERE position = (SELECT MIN(position) FROM auction_queue)', ())]
+  if op == 'mark_unsold':
+      player = event['player']
+      return [
+          ('INSERT INTO unsold (name, category, base_price) VALUES (?, ?, ?)',
+           (player['name'], player['category'], player['base_price'])),
+          ("INSERT INTO sales (player, team, owner, price, sold_at, category, base_price, bids, bidders) VALUES (?, '', '', 0, ?, ?, ?, ?, ?)",
+           (player['name'], event.get('ts', time.time()), player['category'], player['base_price'],
+            event.get('bids', 0), event.get('bidders', 0))),
+      ]
+  if op == 'requeue_unsold':
+      statements = [
+          ('INSERT INTO auction_queue (name, category, base_price) SELECT name, category, base_price FROM unsold '
+           'WHERE name NOT IN (SELECT name FROM auction_queue) ORDER BY id', ()),
+          ('DELETE FROM unsold', ()),
+      ]
+      if event.get('round'):
+          statements.append(('INSERT INTO rounds (label) VALUES (?)', (event['round'],)))
+      return statements
+  if op == 'batch':
+      # Bulk admin changes: every sub-event in this one transaction.
+      return [statement for sub_event in event['events'] for statement in _sqlite_statements(sub_event)]
+  if op == 'set_timer':
+      return [("INSERT OR REPLACE INTO meta (key, value) VALUES ('lot_seconds', ?)", (event['seconds'],)),
+              ("INSERT OR REPLACE INTO meta (key, value) VALUES ('soft_close', ?)", (event['soft_close'],))]
+  if op == 'set_proxy':
+      # REPLACE re-inserts the row, so a changed max bid also moves to the back.
+      key = (str(event['owner']), event['scope'], event['target'])
+      if not event['amount']:
+          return [('DELETE FROM proxies WHERE owner = ? AND scope = ? AND target = ?', key)]
+      return [('INSERT OR REPLACE INTO proxies (owner, scope, target, amount) VALUES (?, ?, ?, ?)', key + (event['amount'],))]
+  if op == 'queue_round':
+      return [('INSERT INTO auction_queue (name, category, base_price) VALUES (?, ?, ?)',
+               (player['name'], player['category'], player['base_price'])) for player in event['players']] + [
+          ('INSERT INTO rounds (label) VALUES (?)', (event['round'],))]
+  if op == 'sell':
+      return [
+          ('UPDATE users SET purse = purse - ? WHERE id = ?', (event['price'], str(event['winner']))),
+          _audit_statement(event.get('ts', 0.0), event['winner'], 'debit', event['price'], f"bought {event['player']}"),
+          ('INSERT INTO roster (team, player) VALUES (?, ?)', (event['team'], event['player'])),
+          ('INSERT INTO sales (player, team, owner, price, sold_at, category, base_price, bids, bidders) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+           (event['player'], event['team'], str(event['winner']), event['price'], event.get('ts', time.time()),
+            event.get('category'), event.get('base_price', event['price']), event.get('bids', 0), event.get('bidders', 0))),
+      ]
+  raise ValueError(f"Unknown event op: {op}")
+
+
+class SqliteStore(BackgroundStore):
+  def __init__(self, path):
+      super().__init__()
+      self.path = path
+      self._conn = None
+
+  def load(self):
+      conn = _sqlite_connect(self.path)
+      try:
+          meta = dict(conn.execute('SELECT key, value FROM meta'))
+          self.seq = meta.get('seq', 0)
+          teams = {}
+          for name, owner, max_size in conn.execute('SELECT name, owner, max_size FROM teams ORDER BY rowid'):
+              teams[name] = {'owner': str(owner), 'max_size': max_size, 'players': []}
+          for team, player in conn.execute('SELECT team, player FROM roster ORDER BY id'):
+              teams[team]['players'].append(player)
+          data = {
+              'teams': teams,
+              'users': {user_id: {'purse': purse} for user_id, purse in conn.execute('SELECT id, purse FROM users')},
+              'auction_channel': meta.get('auction_channel'),
+              'lot_seconds': meta.get('lot_seconds', LOT_SECONDS),
+              'soft_close': meta.get('soft_close', SOFT_CLOSE_SECONDS),
+              'players_for_auction': [
+                  {'name': name, 'category': category, 'base_price': base_price}
+                  for name, category, base_price in conn.execute(
+                      'SELECT name, category, base_price FROM auction_queue ORDER BY position')
+              ],
+              'unsold': [
+                  {'name': name, 'category': category, 'base_price': base_price}
+                  for name, category, base_price in conn.execute(
+                      'SELECT name, category, base_price FROM unsold ORDER BY id')
+              ],
+          }
+          data['rounds'] = [label for (label,) in conn.execute('SELECT label FROM rounds ORDER BY id')]
+          data['proxies'] = [list(row) for row in conn.execute('SELECT owner, scope, target, amount FROM proxies ORDER BY id')]
+          data['purse_audit'] = [list(row) for row in conn.execute('SELECT ts, owner, kind, amount, reason FROM purse_audit ORDER BY id')]
+          sales = {name: [] for name in SaleLedger.COLUMNS}
+          for row in conn.execute('SELECT player, team, category, price, COALESCE(base_price, price), bids, bidders, sold_at '
+                                  'FROM sales ORDER BY id'):
+              for name, value in zip(SaleLedger.COLUMNS, row):
+                  sales[name].append(value)
+          sales['team'] = [team or None for team in sales['team']]
+          data['sales'] = sales
+          authorized = [user_id for (user_id,) in conn.execute('SELECT id FROM authorized')]
+          if authorized:
+              data['authorized'] = authorized
+      finally:
+          conn.close()
+      return data, []
+
+  def load_lots(self):
+      if not os.path.exists(self.path):
+          return {}
+      conn = _sqlite_connect(self.path)
+      try:
+          rows = conn.execute('SELECT message_id, data FROM lots').fetchall()
+      finally:
+          conn.close()
+      return {message_id: json.loads(data) for message_id, data in rows}
+
+  def _open(self):
+      self._conn = _sqlite_connect(self.path)
+
+  def _close(self):
+      self._conn.close()
+
+  def _write(self, batch):
+      for kind, event in batch:
+          if kind != 'event':
+              continue
+          # One transaction per event, committed on leaving the block.
+          with self._conn:
+              for sql, params in _sqlite_statements(event):
+                  self._conn.execute(sql, params)
+              self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seq', ?)", (event['seq'],))
+      lots = [payload for kind, payload in batch if kind == 'lot']
+      if lots:
+          with self._conn:
+              for message_id, lot in lots:
+                  if lot is None:
+                      self._conn.execute('DELETE FROM lots WHERE message_id = ?', (int(message_id),))
+                  else:
+                      self._conn.execute('INSERT OR REPLACE INTO lots (message_id, data) VALUES (?, ?)', (int(message_id), lot))
+
+
+def make_store(directory):
+  if STORAGE_BACKEND == 'sqlite':
+      return SqliteStore(os.path.join(directory, DB_FILE))
+  return EventJournal(os.path.join(directory, DATA_FILE), os.path.join(directory, JOURNAL_FILE), SNAPSHOT_EVERY)
 
-def load_data():
-  global PLAYERS_FOR_AUCTION, TEAMS, USERS
 
-  try:
-      with open('auction_data.json', 'r') as f:
-          data = json.load(f)
-          PLAYERS_FOR_AUCTION = data.get("players_for_auction", [])
-          TEAMS = data.get("teams", {})
-          UNSOLD_PLAYERS = data.get('unsold', [])
-          USERS = data.get("users", {})
-  except FileNotFoundError:
-      PLAYERS_FOR_AUCTION = []
-      TEAMS = {}
-      USERS = {}
-
-load_data()
+
+
+#############################################################
+# League sessions:
+#############################################################
+# One bot process hosts many leagues. Each LeagueSession holds the complete
+# state of one league and persists it in its own directory:
+#   (0, 0), the root guild's league         -> the repo root (auction_data.json)
+#   (guild, 0)       guild-wide league      -> leagues/<guild>-0/
+#   (guild, channel) channel-scoped league  -> leagues/<guild>-<channel>/
+# The root guild is DEFAULT_GUILD_ID if set, otherwise the only guild the bot
+# is in at startup or else the first guild to use it, remembered in
+# leagues/root_guild. A guild that already has leagues/<guild>-0/ never
+# becomes the root guild.
+# A command uses the league of its channel if one was created with
+# !create_league, otherwise its guild's league. Sessions are loaded on first
+# use and evicted from memory after SESSION_IDLE_SECONDS without activity.
+LEAGUE_DIR = 'leagues'
+ROOT_GUILD_FILE = os.path.join(LEAGUE_DIR, 'root_guild')
+ROOT_KEY = (0, 0)
+DEFAULT_GUILD_ID = int(os.environ.get('DEFAULT_GUILD_ID', 0))
+SESSION_IDLE_SECONDS = float(os.environ.get('SESSION_IDLE_SECONDS', 1800))
+
+
+def owner_key(user_id):
+  # Discord IDs arrive as int from the API and as str after a JSON round trip.
+  return str(user_id)
+
+
+class LeagueSession:
+  def __init__(self, key, directory):
+      self.key = key
+      self.directory = directory
+      self.store = make_store(directory)
+      self.store.state_fn = self.to_dict
+      # team name -> TeamRecord; every balance lives in purses.
+      self.teams = {}
+      self.purses = PurseLedger()
+      self.players_for_auction = PlayerCatalog()
+      self.unsold_players = PlayerCatalog()
+      self.auction_channel = None
+      self.authorized_user_ids = set(AUTHORIZED_USER_IDS)
+      self.lot_seconds = LOT_SECONDS
+      self.soft_close = SOFT_CLOSE_SECONDS
+      # Labels of the rounds queued so far, in order ('1', 'combined', 'unsold-1', ...).
+      self.rounds = []
+      self.ledger = SaleLedger()
+      # Standing max bids: (owner key, 'player' or 'category', target) ->
+      # (amount, order). order is registration order and breaks ties.
+      self.proxies = {}
+      self._proxy_order = itertools.count()
+      # Reverse indexes, maintained by the event handlers below so every
+      # code path that changes a roster keeps them in step:
+      #   owner_index:  owner_key(owner id) -> team name
+      #   player_index: rostered player name -> team name
+      # A player can only be on one team because player_index has one slot per name.
+      self.owner_index = {}
+      self.player_index = {}
+      # team name -> version, bumped whenever the team's roster or purse changes.
+      self.team_versions = {}
+      self.active_auctions = set()
+      self.last_used = time.monotonic()
+      # Bumped on every change the HTTP API can see (events and the open
+      # lot); API watchers long-poll on it from their own threads.
+      self.version = 0
+      self.changed = threading.Condition()
+      # auction message id -> checkpoint of the lot open on it, oldest first.
+      self.lots = {}
+      self.snapshot = None
+      # Tasks started on the league's behalf (e.g. the owner prefetch), held
+      # here until they finish so they are not garbage collected mid-run.
+      self.background_tasks = set()
+
+  def load(self):
+      # Rebuild state from the store: the snapshot/tables plus any journal tail.
+      data, events = self.store.load()
+      self.install(data, events)
+      self.lots = self.store.load_lots()
+      self.store.start()
+
+  def install(self, data, events=()):
+      self.players_for_auction = PlayerCatalog(data.get("players_for_auction", []))
+      self.purses = PurseLedger()
+      for user_id, details in data.get("users", {}).items():
+          self.purses.account(user_id).balance = details['purse']
+      self.purses.audit = [tuple(entry) for entry in data.get('purse_audit', [])]
+      # Data saved before the purse ledger kept a second purse on each team;
+      # the owner's balance is the one bids and sales were checked against.
+      legacy = {}
+      self.teams = {}
+      for team_name, team in data.get("teams", {}).items():
+          account = self.purses.account(team['owner'])
+          if 'purse' in team and owner_key(team['owner']) not in data.get("users", {}):
+              account.balance = team['purse']
+          elif 'purse' in team and team['purse'] != account.balance:
+              legacy[team_name] = team['purse']
+          self.teams[team_name] = TeamRecord(team_name, account, team['max_size'], team['players'])
+      self.unsold_players = PlayerCatalog(data.get('unsold', []))
+      self.auction_channel = data.get('auction_channel')
+      self.lot_seconds = data.get('lot_seconds', LOT_SECONDS)
+      self.soft_close = data.get('soft_close', SOFT_CLOSE_SECONDS)
+      self.authorized_user_ids = set(data.get('authorized', AUTHORIZED_USER_IDS))
+      self.rounds = list(data.get('rounds', []))
+      self.ledger = SaleLedger.from_columns(data.get('sales'))
+      self.proxies = {}
+      self._proxy_order = itertools.count()
+      for owner, scope, target, amount in data.get('proxies', []):
+          self.proxies[(owner, scope, target)] = (amount, next(self._proxy_order))
+      self.rebuild_indexes()
+      for event in events:
+          self.apply(event)
+      self.reconcile_purses(legacy)
+
+  def reconcile_purses(self, legacy=None):
+      # Checks every balance against the audit trail. Balances it does not
+      # explain (anything saved before the trail existed) are recorded as a
+      # 'reconcile_purses' event, and a snapshot is taken so the legacy
+      # team purses are not read again.
+      for team_name, team_purse in (legacy or {}).items():
+          log.warning("Team %s had its own purse of %s but its owner's balance is %s; keeping the owner's balance.",
+                      team_name, team_purse, self.teams[team_name].purse)
+      drift = self.purses.discrepancies()
+      for owner_id, (balance, audited) in drift.items():
+          if audited is not None:
+              log.warning("Owner %s has a balance of %s but the audit trail gives %s; keeping the balance.", owner_id, balance, audited)
+      if drift:
+          self.commit('reconcile_purses', balances={owner_id: balance for owner_id, (balance, _) in drift.items()}, ts=time.time())
+          self.store.compact()
+      return drift
+
+  def to_dict(self):
+      return {
+          "players_for_auction": self.players_for_auction.to_list(),
+          "teams": {team_name: team.to_dict() for team_name, team in self.teams.items()},
+          "unsold": self.unsold_players.to_list(),
+          "users": {owner_id: {"purse": record.balance} for owner_id, record in self.purses.owners.items()},
+          "purse_audit": [list(entry) for entry in self.purses.audit],
+          "auction_channel": self.auction_channel,
+          "lot_seconds": self.lot_seconds,
+          "soft_close": self.soft_close,
+          "authorized": sorted(self.authorized_user_ids),
+          "rounds": self.rounds,
+          "sales": self.ledger.to_columns(),
+          "proxies": [list(key) + [amount] for key, (amount, _) in self.proxies.items()],
+      }
+
+  def commit(self, op, **fields):
+      # Apply a mutation in memory and hand it to the store.
+      event = {'op': op, **fields}
+      self.apply(event)
+      self.store.append(event)
+      self.last_used = time.monotonic()
+      return event
+
+  def apply(self, event):
+      getattr(self, '_apply_' + event['op'])(event)
+      self._bump()
+
+  def save_lot(self, message_id, lot):
+      # Checkpoint the lot open on one auction message (None once it closes).
+      self.lots.pop(message_id, None)
+      if lot is not None:
+          self.lots[message_id] = lot
+      self._bump()
+      self.store.save_lot(message_id, lot)
+
+  def _bump(self):
+      with self.changed:
+          self.version += 1
+          self.changed.notify_all()
+
+  def wait_for_change(self, since, timeout):
+      # Called from HTTP threads: blocks until the version moves past since.
+      with self.changed:
+          return self.changed.wait_for(lambda: self.version > since, timeout)
+
+  def close(self, data=None):
+      # data is the state if it was already taken, so this can run off the
+      # event loop.
+      self.store.compact(data)
+      self.store.close()
+
+  def is_idle(self, now):
+      return not self.active_auctions and now - self.last_used > SESSION_IDLE_SECONDS
+
+  def knows_player(self, name):
+      # True if the player is rostered, queued or unsold: all name-indexed.
+      return name in self.player_index or name in self.players_for_auction or name in self.unsold_players
+
+  def owner_ids(self):
+      return list(self.purses.owners)
+
+  def rebuild_indexes(self):
+      self.owner_index.clear()
+      self.player_index.clear()
+      self.team_versions.clear()
+      for team_name, team in self.teams.items():
+          self.owner_index.setdefault(team.owner, team_name)
+          self._touch_team(team_name)
+          for player in team.players:
+              if player in self.player_index:
+                  log.warning("%s is rostered on both %s and %s.", player, self.player_index[player], team_name)
+                  continue
+              self.player_index[player] = team_name
+
+  def _touch_team(self, team_name):
+      self.team_versions[team_name] = next(_VERSIONS)
+
+  def _roster_add(self, team_name, player):
+      self.teams[team_name].players.append(player)
+      self.player_index[player] = team_name
+      self._touch_team(team_name)
+
+  def _roster_remove(self, team_name, player):
+      # Rosters are capped at max_size, so list.remove stays cheap.
+      self.teams[team_name].players.remove(player)
+      if self.player_index.get(player) == team_name:
+          del self.player_index[player]
+      self._touch_team(team_name)
+
+  def _apply_batch(self, event):
+      for sub_event in event['events']:
+          getattr(self, '_apply_' + sub_event['op'])(sub_event)
+
+  def _touch_owner(self, owner_id):
+      team_name = self.owner_index.get(owner_key(owner_id))
+      if team_name is not None:
+          self._touch_team(team_name)
+
+  def _apply_set_purse(self, event):
+      self.purses.set_balance(event['user'], event['amount'], 'set_purse', event.get('ts', 0.0))
+      self._touch_owner(event['user'])
+
+  def _apply_reconcile_purses(self, event):
+      for owner_id, amount in event['balances'].items():
+          self.purses.set_balance(owner_id, amount, 'reconcile', event['ts'])
+          self._touch_owner(owner_id)
+
+  def _apply_set_timer(self, event):
+      self.lot_seconds = event['seconds']
+      self.soft_close = event['soft_close']
+
+  def _apply_set_channel(self, event):
+      self.auction_channel = event['channel']
+
+  def _apply_authorize(self, event):
+      self.authorized_user_ids.add(str(event['user']))
+
+  def _apply_deauthorize(self, event):
+      self.authorized_user_ids.discard(str(event['user']))
+
+  def _apply_create_team(self, event):
+      # An owner who already has a balance keeps it.
+      if event['owner'] not in self.purses:
+          self.purses.set_balance(event['owner'], event['purse'], 'create_team', event.get('ts', 0.0))
+      self.teams[event['team']] = TeamRecord(event['team'], self.purses.account(event['owner']), event['max_size'])
+      self.owner_index[owner_key(event['owner'])] = event['team']
+      self._touch_team(event['team'])
+
+  def _apply_delete_team(self, event):
+      team = self.teams.pop(event['team'])
+      self.team_versions.pop(event['team'], None)
+      if self.owner_index.get(team.owner) == event['team']:
+          del self.owner_index[team.owner]
+      for player in team.players:
+          if self.player_index.get(player) == event['team']:
+              del self.player_index[player]
+
+  def _apply_add_player_to_team(self, event):
+      self._roster_add(event['team'], event['player'])
+
+  def _apply_remove_player(self, event):
+      self._roster_remove(event['team'], event['player'])
+
+  def _apply_trade(self, event):
+      self._roster_remove(event['from_team'], event['player'])
+      self._roster_add(event['to_team'], event['player'])
+
+  def _apply_add_auction_player(self, event):
+      self.players_for_auction.append(event['player'])
+
+  def _apply_add_auction_players(self, event):
+      self.players_for_auction.extend(event['players'])
+
+  def _apply_remove_auction_player(self, event):
+      self.players_for_auction.remove(event['name'])
+
+  def _apply_clear_auction(self, event):
+      self.players_for_auction.clear()
+
+  def _apply_pop_player(self, event):
+      self.players_for_auction.popleft()
+
+  def _apply_mark_unsold(self, event):
+      player = event['player']
+      self.unsold_players.append(player)
+      self.ledger.record(player['name'], None, player.get('category'), 0, player.get('base_price', 0),
+                         event.get('bids', 0), event.get('bidders', 0), event.get('ts', 0.0))
+
+  def _apply_requeue_unsold(self, event):
+      # Unsold players go to the back of the pool, in the order they went unsold.
+      self.players_for_auction.extend(self.unsold_players)
+      self.unsold_players.clear()
+      if event.get('round'):
+          self.rounds.append(event['round'])
+
+  def _apply_set_proxy(self, event):
+      # A changed max bid counts as newly registered; 0 withdraws it.
+      key = (str(event['owner']), event['scope'], event['target'])
+      self.proxies.pop(key, None)
+      if event['amount']:
+          self.proxies[key] = (event['amount'], next(self._proxy_order))
+
+  def _apply_queue_round(self, event):
+      self.players_for_auction.extend(event['players'])
+      self.rounds.append(event['round'])
+
+  def _apply_sell(self, event):
+      self.purses.debit(event['winner'], event['price'], f"bought {event['player']}", event.get('ts', 0.0))
+      self._roster_add(event['team'], event['player'])
+      # Sales journaled before the ledger carry no base price or bid counts.
+      self.ledger.record(event['player'], event['team'], event.get('category'), event['price'],
+                         event.get('base_price', event['price']), event.get('bids', 0), event.get('bidders', 0), event.get('ts', 0.0))
+
+
+class SessionRegistry:
+  def __init__(self):
+      self._sessions = {}
+      self._loading = {}
+      # key -> task closing an evicted session; the league loads again after it.
+      self._closing = {}
+      # The bot's event loop, for threads (the HTTP API) that need league state.
+      self.loop = None
+      self._channel_leagues = set()
+      self.root_guild = DEFAULT_GUILD_ID or None
+
+  def discover(self):
+      # Only lists directory names; no league data is read until first use.
+      if self.root_guild is None:
+          try:
+              with open(ROOT_GUILD_FILE) as f:
+                  self.root_guild = int(f.read())
+          except (FileNotFoundError, ValueError):
+              pass
+      if os.path.isdir(LEAGUE_DIR):
+          for entry in os.listdir(LEAGUE_DIR):
+              guild_id, _, channel_id = entry.partition('-')
+              if guild_id.isdigit() and channel_id.isdigit() and int(channel_id):
+                  self._channel_leagues.add((int(guild_id), int(channel_id)))
+
+  def claim_root(self, guild_id):
+      # Called for guilds the bot is really in, never from the HTTP API.
+      if self.root_guild is not None or not guild_id or os.path.isdir(self.directory((guild_id, 0))):
+          return
+      self.root_guild = guild_id
+      os.makedirs(LEAGUE_DIR, exist_ok=True)
+      with open(ROOT_GUILD_FILE, 'w') as f:
+          f.write(str(guild_id))
+      log.info("Guild %s uses the league in %s.", guild_id, os.path.abspath(DATA_FILE))
+
+  def resolve_key(self, guild_id, channel_id):
+      guild_id = guild_id or 0
+      if (guild_id, channel_id) in self._channel_leagues:
+          return guild_id, channel_id
+      if guild_id == self.root_guild:
+          # One session for the root league, however it is addressed.
+          return ROOT_KEY
+      return guild_id, 0
+
+  def directory(self, key):
+      if key == ROOT_KEY:
+          return '.'
+      guild_id, channel_id = key
+      return os.path.join(LEAGUE_DIR, f"{guild_id}-{channel_id}")
+
+  def loaded(self):
+      return list(self._sessions.values())
+
+  async def get(self, guild_id, channel_id):
+      key = self.resolve_key(guild_id, channel_id)
+      session = self._sessions.get(key)
+      if session is None:
+          session = await self._load(key)
+      session.last_used = time.monotonic()
+      return session
+
+  def get_loaded(self, key):
+      return self._sessions.get(key)
+
+  def lot_checkpoints(self):
+      # (key, lot) for every league with an open auction message.
+      keys = [ROOT_KEY]
+      if os.path.isdir(LEAGUE_DIR):
+          for entry in os.listdir(LEAGUE_DIR):
+              guild_id, _, channel_id = entry.partition('-')
+              if guild_id.isdigit() and channel_id.isdigit():
+                  keys.append((int(guild_id), int(channel_id)))
+      lots = []
+      for key in keys:
+          session = self._sessions.get(key)
+          checkpoints = session.lots if session is not None else make_store(self.directory(key)).load_lots()
+          lots.extend((key, lot) for lot in list(checkpoints.values()))
+      return lots
+
+  def create_channel_league(self, guild_id, channel_id):
+      key = (guild_id, channel_id)
+      os.makedirs(self.directory(key), exist_ok=True)
+      self._channel_leagues.add(key)
+      return key
+
+  async def _load(self, key):
+      # Concurrent first uses of a league share a single load.
+      if key in self._loading:
+          return await self._loading[key]
+      future = asyncio.get_running_loop().create_future()
+      self._loading[key] = future
+      try:
+          if key in self._closing:
+              await asyncio.wait([self._closing[key]])
+          directory = self.directory(key)
+          os.makedirs(directory, exist_ok=True)
+          session = LeagueSession(key, directory)
+          started = time.perf_counter()
+          await asyncio.to_thread(session.load)
+          METRICS.observe('league_load_seconds', time.perf_counter() - started, backend=STORAGE_BACKEND)
+          log.debug("Loaded league %s in %.3fs.", key, time.perf_counter() - started)
+          self._sessions[key] = session
+          future.set_result(session)
+      except Exception as e:
+          future.set_exception(e)
+          raise
+      finally:
+          del self._loading[key]
+      if bot.is_ready():
+          task = asyncio.create_task(USER_CACHE.prefetch(bot, session.owner_ids()))
+          session.background_tasks.add(task)
+          task.add_done_callback(session.background_tasks.discard)
+      return session
+
+  async def evict_idle(self):
+      # The state is taken here on the loop; serializing and writing it and
+      # stopping the writer thread happen on a worker thread.
+      now = time.monotonic()
+      evicted = [key for key, session in self._sessions.items() if session.is_idle(now)]
+      for key in evicted:
+          session = self._sessions.pop(key)
+          RENDER_CACHE.drop(key)
+          self._closing[key] = asyncio.ensure_future(asyncio.to_thread(session.close, session.to_dict()))
+      for key in evicted:
+          try:
+              await self._closing[key]
+          finally:
+              del self._closing[key]
+      return evicted
+
+  def close_all(self):
+      for session in self._sessions.values():
+          session.close()
+      self._sessions.clear()
+
+
+SESSIONS = SessionRegistry()
+SESSIONS.discover()
+METRICS.describe('league_sessions_loaded', 'gauge', 'League sessions held in memory.')
+METRICS.gauge_fn('league_sessions_loaded', lambda: len(SESSIONS.loaded()))
+atexit.register(SESSIONS.close_all)
+
+
+async def league(ctx):
+  # The league session a command or interaction belongs to.
+  guild_id = ctx.guild.id if ctx.guild else 0
+  SESSIONS.claim_root(guild_id)
+  return await SESSIONS.get(guild_id, ctx.channel.id)
+
+
+@tasks.loop(minutes=5)
+async def evict_idle_sessions():
+    evicted = await SESSIONS.evict_idle()
+    if evicted:
+        log.info("Evicted idle league sessions: %s", evicted)
+
+
+def migrate_json_to_sqlite():
+  # One-shot copy of every JSON league (the root auction_data.json and each
+  # leagues/<guild>-<channel>/ directory, journal tails included) into an
+  # auction.db next to it. Round files stay on disk and are read from there.
+  directories = ['.'] + sorted(glob.glob(os.path.join(LEAGUE_DIR, '*-*')))
+  for directory in directories:
+      if not os.path.exists(os.path.join(directory, DATA_FILE)):
+          continue
+      db_path = os.path.join(directory, DB_FILE)
+      conn = _sqlite_connect(db_path)
+      if conn.execute("SELECT 1 FROM meta WHERE key = 'seq'").fetchone():
+          conn.close()
+          log.warning("%s already holds league data; skipping it.", db_path)
+          continue
+      session = LeagueSession(None, directory)
+      journal = EventJournal(os.path.join(directory, DATA_FILE), os.path.join(directory, JOURNAL_FILE), SNAPSHOT_EVERY)
+      session.install(*journal.load())
+
+      with conn:
+          conn.executemany('INSERT INTO users (id, purse) VALUES (?, ?)',
+                           [(owner_id, record.balance) for owner_id, record in session.purses.owners.items()])
+          conn.executemany('INSERT INTO purse_audit (ts, owner, kind, amount, reason) VALUES (?, ?, ?, ?, ?)',
+                           session.purses.audit)
+          for name, team in session.teams.items():
+              conn.execute('INSERT INTO teams (name, owner, max_size) VALUES (?, ?, ?)',
+                           (name, team.owner, team.max_size))
+              conn.executemany('INSERT INTO roster (team, player) VALUES (?, ?)',
+                               [(name, player) for player in team.players])
+          conn.executemany('INSERT INTO auction_queue (name, category, base_price) VALUES (?, ?, ?)',
+                           [(p['name'], p['category'], p['base_price']) for p in session.players_for_auction])
+          conn.executemany('INSERT INTO unsold (name, category, base_price) VALUES (?, ?, ?)',
+                           [(p['name'], p['category'], p['base_price']) for p in session.unsold_players])
+          conn.executemany('INSERT INTO authorized (id) VALUES (?)',
+                           [(user_id,) for user_id in session.authorized_user_ids])
+          conn.executemany('INSERT INTO rounds (label) VALUES (?)', [(label,) for label in session.rounds])
+          conn.executemany('INSERT INTO proxies (owner, scope, target, amount) VALUES (?, ?, ?, ?)',
+                           [key + (amount,) for key, (amount, _) in session.proxies.items()])
+          ledger = session.ledger
+          conn.executemany(
+              'INSERT INTO sales (player, team, owner, price, sold_at, category, base_price, bids, bidders) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+              [(sale['player'], sale['team'] or '', session.teams[sale['team']].owner if sale['team'] in session.teams else '', sale['price'], sale['ts'],
+                sale['category'], sale['base_price'], sale['bids'], sale['bidders'])
+               for sale in map(ledger.row, range(len(ledger)))])
+          if session.auction_channel is not None:
+              conn.execute("INSERT INTO meta (key, value) VALUES ('auction_channel', ?)", (session.auction_channel,))
+          conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)',
+                           [('lot_seconds', session.lot_seconds), ('soft_close', session.soft_close)])
+          conn.execute("INSERT INTO meta (key, value) VALUES ('seq', 0)")
+      conn.close()
+      log.info("Migrated %d teams, %d users, %d queued players and %d unsold players into %s.",
+               len(session.teams), len(session.purses), len(session.players_for_auction),
+               len(session.unsold_players), db_path)
+
+
+#############################################################
+# HTTP API:
+#############################################################
+# Read-only JSON for dashboards, served by the Flask app on its own thread:
+#   /api/<section>                              the root league
+#   /api/<guild_id>/<channel_id>/<section>      any other league
+# Sections: state, teams, purses, pool, unsold, lots (one per open auction
+# message) and lot (the latest of them). Each section is serialized on the
+# bot's loop (where state is mutated) the first time it is asked for at a
+# version and kept until the league's version changes. Responses carry an
+# ETag for If-None-Match, and ?since=<version>&wait=<seconds> long-polls
+# for the next change.
+API_SECTIONS = ('state', 'teams', 'purses', 'pool', 'unsold', 'lots', 'lot')
+API_MAX_WAIT = float(os.environ.get('API_MAX_WAIT', 30))
+API_LOOP_TIMEOUT = 5
+_API_BOOT = format(int(time.time()), 'x')  # versions restart with the process
+
+
+def _api_section_value(session, section):
+  if section == 'teams':
+      return {
+          name: {'owner': team.owner, 'max_size': team.max_size, 'purse': team.purse, 'players': list(team.players)}
+          for name, team in session.teams.items()
+      }
+  if section == 'purses':
+      return {owner_id: record.balance for owner_id, record in session.purses.owners.items()}
+  if section == 'pool':
+      return session.players_for_auction.to_list()
+  if section == 'unsold':
+      return session.unsold_players.to_list()
+  if section == 'lots':
+      return list(session.lots.values())
+  if section == 'lot':
+      # The most recently checkpointed lot, for dashboards that predate 'lots'.
+      return next(reversed(session.lots.values()), None)
+  return {name: _api_section_value(session, name) for name in API_SECTIONS if name != 'state'}
+
+
+class LeagueSnapshot:
+  __slots__ = ('version', 'key', 'bodies')
+
+  def __init__(self, session):
+      self.version = session.version
+      self.key = session.key
+      self.bodies = {}  # section -> JSON body, filled in as sections are asked for
+
+  def etag(self, section):
+      guild_id, channel_id = self.key
+      return f"{_API_BOOT}-{guild_id}-{channel_id}-{self.version}-{section}"
+
+  def render(self, session, section):
+      # On the bot's loop, and only while session.version == self.version.
+      if section not in self.bodies:
+          value = _api_section_value(session, section)
+          self.bodies[section] = json.dumps({'version': self.version, section: value}, separators=(',', ':')).encode()
+      return self.bodies[section]
+
+
+def _on_bot_loop(coro):
+  # Runs coro on the bot's event loop from an HTTP thread.
+  loop = SESSIONS.loop
+  if loop is None or not loop.is_running():
+      coro.close()
+      return None
+  return asyncio.run_coroutine_threadsafe(coro, loop).result(API_LOOP_TIMEOUT)
+
+async def _api_session(guild_id, channel_id):
+  key = SESSIONS.resolve_key(guild_id, channel_id)
+  if SESSIONS.get_loaded(key) is None and not os.path.isdir(SESSIONS.directory(key)):
+      return None  # never create leagues from the API
+  return await SESSIONS.get(*key)
+
+async def _api_snapshot(session, section):
+  if session.snapshot is None or session.snapshot.version != session.version:
+      session.snapshot = LeagueSnapshot(session)
+  session.snapshot.render(session, section)
+  return session.snapshot
+
+
+@web_route('/api/<section>', '/api/<int:guild_id>/<int:channel_id>/<section>')
+def api_section(section, guild_id=0, channel_id=0):
+    from flask import Response, request
+    if section not in API_SECTIONS:
+        return Response('{"error": "unknown section"}', status=404, mimetype='application/json')
+    session = SESSIONS.get_loaded(SESSIONS.resolve_key(guild_id, channel_id)) or _on_bot_loop(_api_session(guild_id, channel_id))
+    if session is None:
+        return Response('{"error": "unknown league"}', status=404, mimetype='application/json')
+
+    since = request.args.get('since', type=int)
+    if since is not None:
+        wait = min(request.args.get('wait', API_MAX_WAIT, type=float), API_MAX_WAIT)
+        session.wait_for_change(since, wait)
+
+    snapshot = session.snapshot
+    current = snapshot is not None and snapshot.version == session.version
+    if current and request.if_none_match.contains(snapshot.etag(section)):
+        # Unchanged for this client: nothing to serialize.
+        body = None
+    else:
+        if not current or section not in snapshot.bodies:
+            snapshot = _on_bot_loop(_api_snapshot(session, section)) or snapshot
+        body = snapshot.bodies.get(section) if snapshot is not None else None
+        if body is None:
+            return Response('{"error": "league not ready"}', status=503, mimetype='application/json')
+
+    etag = snapshot.etag(section)
+    headers = {'X-State-Version': str(snapshot.version), 'Cache-Control': 'no-cache'}
+    if body is None or request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response
+
 
 @bot.command(name='set_purse', help='Sets the purse amount for a specified Discord user.\nUsage: !set_purse [@user] [amount]\nExample: !set_purse @JohnDoe 50000')
 @commands.has_permissions(administrator=True)  # Ensure only admins can set purses
 async def set_purse(ctx, user: discord.User, amount: int):
-    USERS[user.id] = {"purse": amount}
-    save_data()  
+    session = await league(ctx)
+    session.commit('set_purse', user=owner_key(user.id), amount=amount, ts=time.time())
 
     await ctx.send(f"Set the purse for {user.display_name} to {amount}.")
 
+#############################################################
+# User resolution:
+#############################################################
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 512))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 3600))
+
+
+class UserCache:
+  """Resolves Discord users without spending REST calls where possible.
+
+  Lookups try the gateway cache (client.get_user) first, then a bounded
+  TTL/LRU cache of earlier fetches, and only then client.fetch_user.
+  Concurrent fetches of the same ID share one request.
+  """
+
+  def __init__(self, maxsize, ttl):
+      self.maxsize = maxsize
+      self.ttl = ttl
+      self._entries = OrderedDict()  # user id -> (expires_at, user)
+      self._inflight = {}
+      self.gateway_hits = 0
+      self.hits = 0
+      self.misses = 0
+      self.failures = 0
+
+  async def resolve(self, client, user_id):
+      user_id = int(user_id)
+      user = client.get_user(user_id)
+      if user is not None:
+          self.gateway_hits += 1
+          return user
+
+      entry = self._entries.get(user_id)
+      if entry is not None:
+          if entry[0] > time.monotonic():
+              self._entries.move_to_end(user_id)
+              self.hits += 1
+              return entry[1]
+          del self._entries[user_id]
+
+      self.misses += 1
+      if user_id in self._inflight:
+          return await self._inflight[user_id]
+      future = asyncio.get_running_loop().create_future()
+      self._inflight[user_id] = future
+      user = None
+      try:
+          user = await client.fetch_user(user_id)
+      except discord.HTTPException as e:
+          log_sampled(logging.WARNING, 'fetch_user_failed', "Could not fetch user %s: %s", user_id, e)
+          self.failures += 1
+      finally:
+          del self._inflight[user_id]
+          # Callers waiting on this fetch get None if it failed any other way
+          # (cancelled, connection error); the error stays with this caller.
+          future.set_result(user)
+      if user is not None:
+          self._store(user_id, user)
+      return user
+
+  async def prefetch(self, client, user_ids, concurrency=5):
+      # Warm the cache in the background, a few requests at a time.
+      semaphore = asyncio.Semaphore(concurrency)
+
+      async def fetch_one(user_id):
+          async with semaphore:
+              await self.resolve(client, user_id)
+
+      unique_ids = {int(user_id) for user_id in user_ids}
+      await asyncio.gather(*(fetch_one(user_id) for user_id in unique_ids))
+      return len(unique_ids)
+
+  def stats(self):
+      return {
+          'gateway_hits': self.gateway_hits,
+          'hits': self.hits,
+          'misses': self.misses,
+          'failures': self.failures,
+          'size': len(self._entries),
+      }
+
+  def _store(self, user_id, user):
+      self._entries[user_id] = (time.monotonic() + self.ttl, user)
+      self._entries.move_to_end(user_id)
+      while len(self._entries) > self.maxsize:
+          self._entries.popitem(last=False)
+
+
+USER_CACHE = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+METRICS.describe('user_cache_entries', 'gauge', 'Users held in the user cache.')
+METRICS.gauge_fn('user_cache_entries', lambda: USER_CACHE.stats()['size'])
+
+
+@bot.event
+async def on_ready():
+    mark_startup('on_ready')
+    log.info("Logged in as %s.", bot.user)
+    SESSIONS.loop = asyncio.get_running_loop()
+    if not evict_idle_sessions.is_running():
+        evict_idle_sessions.start()
+    if not measure_loop_lag.is_running():
+        measure_loop_lag.start()
+    if 'usable' not in STARTUP:
+        # The first click on a resumed auction, or the first command in the
+        # default league, should not wait for a league to load.
+        if len(bot.guilds) == 1:
+            SESSIONS.claim_root(bot.guilds[0].id)
+        keys = await resume_open_auctions() or [ROOT_KEY]
+        await asyncio.gather(*(SESSIONS.get(*key) for key in keys))
+        mark_startup('usable')
+        log.info("Startup: imported in %.2fs, on_ready at %.2fs, auctions usable at %.2fs.",
+                 STARTUP.get('imported', 0.0), STARTUP['on_ready'], STARTUP['usable'])
+    # Leagues load lazily; warm the cache for the ones already in memory
+    # (each league prefetches its own owners when it is first loaded).
+    owner_ids = [user_id for session in SESSIONS.loaded() for user_id in session.owner_ids()]
+    prefetched = await USER_CACHE.prefetch(bot, owner_ids)
+    log.info("Prefetched %d users: %s", prefetched, USER_CACHE.stats())
+
+@bot.command(name='startup_stats', help='Shows how long the last start took: importing, connecting to Discord and getting auctions usable.')
+@commands.has_permissions(administrator=True)
+async def startup_stats(ctx):
+    embed = discord.Embed(title="Startup", color=discord.Color.blue())
+    for phase, label in (('imported', "Imported"), ('on_ready', "Connected (on_ready)"), ('usable', "Auctions usable")):
+        if phase in STARTUP:
+            embed.add_field(name=label, value=f"{STARTUP[phase]:.2f}s", inline=True)
+    embed.add_field(name="Snapshot", value="SQLite" if STORAGE_BACKEND == 'sqlite' else "pickle, JSON fallback", inline=True)
+    await ctx.send(embed=embed)
+
+@bot.command(name='user_cache_stats', help='Shows hit/miss counters for the Discord user cache.')
+@commands.has_permissions(administrator=True)
+async def user_cache_stats(ctx):
+    stats = USER_CACHE.stats()
+    embed = discord.Embed(title="User Cache", color=discord.Color.blue())
+    embed.add_field(name="Gateway hits", value=str(stats['gateway_hits']), inline=True)
+    embed.add_field(name="Cache hits", value=str(stats['hits']), inline=True)
+    embed.add_field(name="Misses (REST)", value=str(stats['misses']), inline=True)
+    embed.add_field(name="Failures", value=str(stats['failures']), inline=True)
+    embed.add_field(name="Cached users", value=str(stats['size']), inline=True)
+    await ctx.send(embed=embed)
+
 #############################################################
 # Auction Channel:
 #############################################################
 @bot.command(name='set_auction_channel')
 @commands.has_permissions(administrator=True)  # Ensure only users with administrator permissions can set the channel
 async def set_auction_channel(ctx):
-    global AUCTION_CHANNEL
-    AUCTION_CHANNEL = ctx.channel.id  # Set the current channel as the auction channel
+    session = await league(ctx)
+    session.commit('set_channel', channel=ctx.channel.id)  # Set the current channel as the auction channel
     await ctx.send(f"Auction channel set to {ctx.channel.name}")
 
+@bot.command(name='create_league', help='Starts a separate league scoped to this channel instead of the server-wide one.')
+@commands.has_permissions(administrator=True)
+@commands.guild_only()
+async def create_league(ctx):
+    if SESSIONS.resolve_key(ctx.guild.id, ctx.channel.id) == (ctx.guild.id, ctx.channel.id):
+        await ctx.send("This channel already has its own league.")
+        return
+    SESSIONS.create_channel_league(ctx.guild.id, ctx.channel.id)
+    session = await league(ctx)
+    session.commit('set_channel', channel=ctx.channel.id)
+    await ctx.send(f"Created a new league for #{ctx.channel.name}. Commands in this channel now use it.")
+
+@bot.command(name='authorize', help='Lets a user run the auction (Next Player / Sold Player) in this league.\nUsage: !authorize [@user]')
+@commands.has_permissions(administrator=True)
+async def authorize(ctx, user: discord.User):
+    session = await league(ctx)
+    session.commit('authorize', user=str(user.id))
+    await ctx.send(f"{user.display_name} can now run the auction.")
+
+@bot.command(name='deauthorize', help='Stops a user from running the auction in this league.\nUsage: !deauthorize [@user]')
+@commands.has_permissions(administrator=True)
+async def deauthorize(ctx, user: discord.User):
+    session = await league(ctx)
+    session.commit('deauthorize', user=str(user.id))
+    await ctx.send(f"{user.display_name} can no longer run the auction.")
+
+#############################################################
+# Paginated views:
+#############################################################
+# Pool pages and roster embeds are cached against the version of the data
+# they were built from, so repeated !view_auction_players / !team_info calls
+# and page flips reuse them until the pool or that roster actually changes.
+# Keys are (kind, league key, ...); the least recently used entries go once
+# there are RENDER_CACHE_SIZE of them, and a league's go when it is evicted.
+PAGE_SIZE = 10
+RENDER_CACHE_SIZE = int(os.environ.get('RENDER_CACHE_SIZE', 1024))
+
+
+class RenderCache:
+  def __init__(self, maxsize):
+      self.maxsize = maxsize
+      self._entries = OrderedDict()  # key -> (version, value)
+
+  def __len__(self):
+      return len(self._entries)
+
+  def get(self, key, version):
+      entry = self._entries.get(key)
+      if entry is not None and entry[0] == version:
+          self._entries.move_to_end(key)
+          return entry[1]
+      return None
+
+  def put(self, key, version, value):
+      self._entries[key] = (version, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+          self._entries.popitem(last=False)
+      return value
+
+  def drop(self, league_key):
+      for key in [key for key in self._entries if key[1] == league_key]:
+          del self._entries[key]
+
+
+RENDER_CACHE = RenderCache(RENDER_CACHE_SIZE)
+METRICS.describe('render_cache_entries', 'gauge', 'Pool pages, roster embeds and plans held in the render cache.')
+METRICS.gauge_fn('render_cache_entries', lambda: len(RENDER_CACHE))
+
+
+def auction_pool_pages(session, category=None):
+  # Returns the list of page descriptions for the pool, optionally filtered.
+  key = ('pool', session.key, category)
+  pages = RENDER_CACHE.get(key, session.players_for_auction.version)
+  if pages is None:
+      players = session.players_for_auction.by_category(category) if category else list(session.players_for_auction)
+      lines = [f"**Name**: {player['name']}, **Category**: {player['category']}, **Base Price**: {player['base_price']}"
+               for player in players]
+      pages = ["\n".join(lines[i:i + PAGE_SIZE]) for i in range(0, len(lines), PAGE_SIZE)]
+      RENDER_CACHE.put(key, session.players_for_auction.version, pages)
+  return pages
+
+async def roster_embed(client, session, team_name):
+  key = ('team', session.key, team_name)
+  version = session.team_versions.get(team_name)
+  embed = RENDER_CACHE.get(key, version)
+  if embed is not None:
+      return embed
+
+  team = session.teams[team_name]
+  players = team.players
+  max_size = team.max_size
+  purse = team.purse
+  owner_id = team.owner
+
+  # Format player names as a list
+  if players:
+      player_list = '\n'.join([f'- {player}' for player in players])
+  else:
+      player_list = 'No players'
+
+  owner = await USER_CACHE.resolve(client, owner_id)
+  owner_name = owner.display_name if owner else "Unknown"
+
+  # purse format
+  formatted_purse = f"${purse:,.2f}"
+
+  # Prepare the embed message
+  embed = discord.Embed(title=f"Team: {team_name}", color=discord.Color.blue())
+  embed.add_field(name="Owner", value=owner_name, inline=False)
+  embed.add_field(name="Max Size", value=str(max_size), inline=True)
+  embed.add_field(name="Purse", value=formatted_purse, inline=True)
+  embed.add_field(name="Players", value=player_list, inline=False)
+  return RENDER_CACHE.put(key, version, embed)
+
+
+class JumpToPageModal(discord.ui.Modal, title='Jump to page'):
+  page_number = discord.ui.TextInput(label='Page number', max_length=6)
+
+  def __init__(self, paginator):
+      super().__init__()
+      self.paginator = paginator
+
+  @timed_callback('pool_jump_submit')
+  async def on_submit(self, interaction: discord.Interaction):
+      try:
+          self.paginator.page = int(self.page_number.value) - 1
+      except ValueError:
+          await interaction.response.send_message("That is not a page number.", ephemeral=True)
+          return
+      await self.paginator.show(interaction)
+
+
+class AuctionPlayersPaginator(discord.ui.View):
+  """One message for the whole pool: prev/next/jump plus a category filter."""
+
+  def __init__(self, session, category=None, *, timeout=600):
+      super().__init__(timeout=timeout)
+      self.session = session
+      self.category = category
+      self.page = 0
+      for option in self.category_filter.options:
+          option.default = option.value == (category or 'All')
+
+  def render(self):
+      pages = auction_pool_pages(self.session, self.category)
+      self.page = max(0, min(self.page, len(pages) - 1))
+      title = "Auction Players List" + (f" - {self.category}" if self.category else "")
+      description = pages[self.page] if pages else "No players in this category."
+      embed = discord.Embed(title=title, description=description, color=discord.Color.blue())
+      embed.set_footer(text=f"Page {self.page + 1}/{max(len(pages), 1)}")
+      self.previous_page.disabled = self.page == 0
+      self.next_page.disabled = self.page >= len(pages) - 1
+      return embed
+
+  async def show(self, interaction):
+      await interaction.response.edit_message(embed=self.render(), view=self)
+
+  @discord.ui.button(label="Prev", style=discord.ButtonStyle.grey)
+  @timed_callback('pool_prev')
+  async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+      self.page -= 1
+      await self.show(interaction)
+
+  @discord.ui.button(label="Next", style=discord.ButtonStyle.grey)
+  @timed_callback('pool_next')
+  async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+      self.page += 1
+      await self.show(interaction)
+
+  @discord.ui.button(label="Jump", style=discord.ButtonStyle.blurple)
+  @timed_callback('pool_jump')
+  async def jump_to_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+      await interaction.response.send_modal(JumpToPageModal(self))
+
+  @discord.ui.select(placeholder="Filter by category",
+                     options=[discord.SelectOption(label=category) for category in ['All'] + CATEGORIES])
+  @timed_callback('pool_category')
+  async def category_filter(self, interaction: discord.Interaction, select: discord.ui.Select):
+      self.category = None if select.values[0] == 'All' else select.values[0]
+      for option in select.options:
+          option.default = option.value == select.values[0]
+      self.page = 0
+      await self.show(interaction)
+
 #############################################################
 # team logics:
 #############################################################
 @bot.command(name='delete_team')
 @commands.has_permissions(administrator=True)  
 async def delete_team(ctx, team_name: str):
+    session = await league(ctx)
     # Check if the team exists
-    if team_name not in TEAMS:
+    if team_name not in session.teams:
         await ctx.send(f"Team '{team_name}' does not exist.")
         return
 
     # Optional: Check if the requester is the team owner or an admin
-    if TEAMS[team_name]['owner'] != ctx.author.id and not ctx.author.guild_permissions.administrator:
+    if session.teams[team_name].owner != owner_key(ctx.author.id) and not ctx.author.guild_permissions.administrator:
         await ctx.send("You do not have permission to delete this team.")
         return
 
     # Delete the team
-    del TEAMS[team_name]
-    save_data() 
+    session.commit('delete_team', team=team_name)
 
     await ctx.send(f"Team '{team_name}' has been successfully deleted.")
 
 
 @bot.command(name='create_team', help='Creates a new team with a specified name, maximum size, and purse.\nUsage: !create_team [team_name] [max_size] [purse]\nExample: !create_team "Dream Team" 11 100000')
 async def create_team(ctx, team_name: str, max_size: int = MAX_TEAM_SIZE, purse: int = MAX_PURSE):
+  session = await league(ctx)
   # Check if the team name already exists to prevent duplicates
-  if team_name in TEAMS:
+  if team_name in session.teams:
       await ctx.send(f"Team '{team_name}' already exists.")
       return
 
   # Correctly obtain the user's ID who issued the command
   owner_id = ctx.author.id 
+  if owner_key(owner_id) in session.owner_index:
+      await ctx.send(f"You already own Team '{session.owner_index[owner_key(owner_id)]}'.")
+      return
 
   # Create the team and associate it with the user's ID
-  TEAMS[team_name] = {
-      'owner': owner_id,  
-      'max_size': max_size,
-      'purse': purse,
-      'players': []
-  }
-  if owner_id not in USERS:
-    USERS[owner_id] = {'purse': purse}
-  save_data()  
-  pprint.pprint(USERS)
-  await ctx.send(f"Team {team_name} created with max size {max_size}, purse {purse}, and owner {ctx.author.display_name}.")
+  session.commit('create_team', team=team_name, owner=owner_key(owner_id), max_size=max_size, purse=purse, ts=time.time())
+  log.debug("Created team %s for owner %s.", team_name, owner_id)
+  # An owner who already has a balance keeps it rather than the purse given.
+  balance = session.purses.balance(owner_key(owner_id))
+  reply = f"Team {team_name} created with max size {max_size}, purse {balance}, and owner {ctx.author.display_name}."
+  if balance != purse:
+      reply += f" {ctx.author.display_name} already had a balance, so it was kept instead of {purse}; use !set_purse to change it."
+  await ctx.send(reply)
 
 @bot.command(name='add_player_to_team', help='Adds a specified player to a specified team.\nUsage: !add_player_to_team [team_name] [player_name]\nExample: !add_player_to_team "Dream Team" "John Doe"')
 async def add_player_to_team(ctx, team_name: str, *, player_name: str):
-    if team_name not in TEAMS:
+    session = await league(ctx)
+    if team_name not in session.teams:
         await ctx.send("Team does not exist.")
         return
-    if len(TEAMS[team_name]["players"]) >= TEAMS[team_name]["max_size"]:
+    if session.teams[team_name].is_full():
         await ctx.send("Team is at maximum capacity.")
         return
-    TEAMS[team_name]["players"].append(player_name)
-    save_data()
+    if player_name in session.player_index:
+        await ctx.send(f"{player_name} is already on Team '{session.player_index[player_name]}'.")
+        return
+    session.commit('add_player_to_team', team=team_name, player=player_name)
     await ctx.send(f"Added {player_name} to {team_name}.")
 
 @bot.command(name='remove_player', help='Removes a specified player from a specified team.\nUsage: !remove_player [team_name] [player_name]\nExample: !remove_player "Dream Team" "John Doe"')
 async def remove_player(ctx, team_name: str, *, player_name: str):
   try:
+    session = await league(ctx)
     # Check if the team exists
-    if team_name not in TEAMS:
+    if team_name not in session.teams:
         await ctx.send(f"Team '{team_name}' not found.")
         return
 
     # Check if the player is in the team
-    if player_name not in TEAMS[team_name]['players']:
+    if session.player_index.get(player_name) != team_name:
         await ctx.send(f"Player '{player_name}' is not in Team '{team_name}'.")
         return
 
     # Log current state before removal for debugging
-    print(f"Before removal: {TEAMS[team_name]['players']}")
+    log.debug("Before removal: %s", session.teams[team_name].players)
 
     # Remove the player from the team
-    TEAMS[team_name]['players'].remove(player_name)
-    save_data()  # Save the updated data to JSON
+    session.commit('remove_player', team=team_name, player=player_name)
 
     # Log current state after removal for debugging
-    print(f"After removal: {TEAMS[team_name]['players']}")
+    log.debug("After removal: %s", session.teams[team_name].players)
 
     await ctx.send(f"Removed player '{player_name}' from Team '{team_name}'.")
   except Exception as e:
-    print(f"Error occurred: {e}")
+    log.exception("Error removing %s from %s: %s", player_name, team_name, e)
 
 
 
 @bot.command(name='team_info', help='Displays information about a specified team, including players, max size, and remaining purse.\nUsage: !team_info [team_name]\nExample: !team_info "Dream Team"')
 async def team_info(ctx, team_name: str):
+          session = await league(ctx)
           # Check if the team exists
-          if team_name in TEAMS:
-              team = TEAMS[team_name]
-              players = team.get("players", [])
-              max_size = team.get("max_size", 0)
-              purse = team.get("purse", 0)
-              owner_id = team.get("owner")
-
-              # Format player names as a list
-              if players:
-                  player_list = '\n'.join([f'- {player}' for player in players])
+          if team_name in session.teams:
+              await ctx.send(embed=await roster_embed(ctx.bot, session, team_name))
+          else:
+              await ctx.send(f"Team '{team_name}' not found.")
+
+
+
+#############################################################
+# Sale analytics:
+#############################################################
+# Answered from the ledger's running aggregates; no command rescans the
+# sale history.
+@bot.command(name='team_spend', help='Shows how much each team has spent at auction and on how many players.')
+async def team_spend(ctx):
+    session = await league(ctx)
+    spend = session.ledger.team_spend
+    if not spend:
+        await ctx.send("No players have been sold yet.")
+        return
+    embed = discord.Embed(title="Spend per team", color=discord.Color.gold())
+    for team_name, (spent, bought) in sorted(spend.items(), key=lambda item: item[1][0], reverse=True)[:25]:
+        embed.add_field(name=team_name, value=f"${spent:,} on {bought} players (avg ${spent // bought:,})", inline=False)
+    await ctx.send(embed=embed)
+
+@bot.command(name='category_stats', help='Shows sold/unsold counts, average and max price and the premium over base price per category.')
+async def category_stats(ctx):
+    session = await league(ctx)
+    embed = discord.Embed(title="Prices by category", color=discord.Color.gold())
+    for category, (sold, unsold, total, base_total, max_price, max_player) in session.ledger.category_stats.items():
+        if not sold and not unsold:
+            continue
+        if sold:
+            premium = (total - base_total) / base_total if base_total else 0.0
+            value = (f"Sold {sold}, unsold {unsold}\n"
+                     f"Avg ${total // sold:,}, max ${max_price:,} ({max_player})\n"
+                     f"Premium over base: {premium:+.0%}")
+        else:
+            value = f"Sold 0, unsold {unsold}"
+        embed.add_field(name=category, value=value, inline=False)
+    if not embed.fields:
+        await ctx.send("No lots have closed yet.")
+        return
+    await ctx.send(embed=embed)
+
+@bot.command(name='top_buys', help=f'Shows the most expensive players sold so far.\nUsage: !top_buys [count]\nExample: !top_buys 5 (at most {TOP_BUYS})')
+async def top_buys(ctx, count: int = TOP_BUYS):
+    session = await league(ctx)
+    buys = session.ledger.top_buys(max(1, min(count, TOP_BUYS)))
+    if not buys:
+        await ctx.send("No players have been sold yet.")
+        return
+    lines = [f"{rank}. {player} to {team_name} for ${price:,} (base ${base_price:,})"
+             for rank, (player, team_name, price, base_price) in enumerate(buys, start=1)]
+    await ctx.send(embed=discord.Embed(title="Top buys", description="\n".join(lines), color=discord.Color.gold()))
+
+
+
+
+#############################################################
+# Roster planner:
+#############################################################
+# !plan suggests the best set of players a team can still buy from the
+# pool: no more than its open slots, within its purse, and at least the
+# requested number per category. A player's value is their base price (the
+# league's own rating of them). The price to pay is predicted as base price
+# times (1 + the category's premium so far, from the sale ledger), or is
+# just the base price with "base". Players with the same category, price
+# and value are interchangeable, so the search runs over those groups
+# rather than over players; pools of thousands form a few dozen groups.
+PLAN_SHOWN = 15          # players listed per category
+PLAN_NODE_LIMIT = 100000  # search nodes before settling for the best plan found
+
+
+def category_premiums(ledger):
+  # category -> average markup over base price of the players sold so far.
+  premiums = {}
+  for category, (sold, _, total, base_total, _, _) in ledger.category_stats.items():
+      premiums[category] = max(0.0, (total - base_total) / base_total) if sold and base_total else 0.0
+  return premiums
+
+
+def plan_roster(players, slots, budget, needs, premiums=None):
+  """Most valuable affordable set of players, by branch and bound.
+
+  needs maps category -> minimum count; premiums (category -> markup)
+  turns base prices into predicted prices. Returns (picks, cost, value,
+  exact) where picks is a list of (player, predicted price) and exact is
+  False if the search hit PLAN_NODE_LIMIT, or None if the needs cannot be
+  met within the slots and budget.
+  """
+  groups = {}
+  for player in players:
+      category = normalize_category(player.get('category'))
+      base_price = player.get('base_price', 0)
+      price = int(base_price * (1 + premiums.get(category, 0.0))) if premiums else base_price
+      groups.setdefault((category, price, base_price), []).append(player)
+
+  # A group is never needed if the slots can be filled from players of its
+  # category that cost no more and are worth no less: swapping them in keeps
+  # every count and does not lower the value.
+  kept = []
+  for category in sorted({key[0] for key in groups}, key=str):
+      better = []  # min-heap of the best `slots` values seen at or below this price
+      for key in sorted((key for key in groups if key[0] == category), key=lambda key: (key[1], -key[2])):
+          if slots and len(better) == slots and better[0] >= key[2]:
+              continue
+          kept.append(key)
+          for _ in range(min(len(groups[key]), slots)):
+              if len(better) < slots:
+                  heapq.heappush(better, key[2])
               else:
-                  player_list = 'No players'
+                  heapq.heappushpop(better, key[2])
+
+  # Relaxing the budget with a price per unit of spend (rate) bounds any
+  # plan by rate * budget plus its `slots` best values net of rate * price.
+  # That bound is convex in the rate, so the tightest one for the whole pool
+  # is found by ternary search.
+  def relaxed(rate):
+      total, remaining = rate * budget, slots
+      for net, count in heapq.nlargest(slots, ((key[2] - rate * key[1], len(groups[key])) for key in kept)):
+          if net <= 0 or not remaining:
+              break
+          total += net * min(count, remaining)
+          remaining -= min(count, remaining)
+      return total
+  low, high = 0.0, max((key[2] / key[1] for key in kept if key[1]), default=0.0)
+  for _ in range(30 if budget and slots else 0):
+      a, b = low + (high - low) / 3, high - (high - low) / 3
+      if relaxed(a) <= relaxed(b):
+          high = b
+      else:
+          low = a
+  rate = (low + high) / 2
+
+  # Best net value first, so the first dive follows the relaxed plan.
+  keys = sorted(kept, key=lambda key: (rate * key[1] - key[2], key[1]))
+  categories = sorted({key[0] for key in keys} | set(needs), key=str)
+  group_count = len(keys)
+  cat = [categories.index(key[0]) for key in keys]
+  price = [key[1] for key in keys]
+  value = [key[2] for key in keys]
+  available = [len(groups[key]) for key in keys]
+
+  def suffix_best(weights):
+      # For every suffix of the groups, the running totals of its `slots`
+      # largest positive weights, counting each player once.
+      tables = [[] for _ in range(group_count + 1)]
+      for g in range(group_count - 1, -1, -1):
+          after = tables[g + 1]
+          largest = heapq.nlargest(slots, itertools.chain(
+              itertools.repeat(weights[g], min(available[g], slots) if weights[g] > 0 else 0),
+              (b - a for a, b in zip([0] + after, after))))
+          tables[g] = list(itertools.accumulate(largest))
+      return tables
+  best_values = suffix_best(value)
+  best_net = suffix_best([value[g] - rate * price[g] for g in range(group_count)])
+
+  # For every suffix of the groups: players left per category and the
+  # cheapest of them, to prune branches that can no longer meet the needs.
+  left = [[0] * len(categories) for _ in range(group_count + 1)]
+  cheapest = [[float('inf')] * len(categories) for _ in range(group_count + 1)]
+  for g in range(group_count - 1, -1, -1):
+      left[g] = left[g + 1][:]
+      cheapest[g] = cheapest[g + 1][:]
+      left[g][cat[g]] += available[g]
+      cheapest[g][cat[g]] = min(cheapest[g][cat[g]], price[g])
+
+  def feasible(g, slots, budget, need):
+      if sum(need) > slots:
+          return False
+      spend = 0
+      for c, count in enumerate(need):
+          if count:
+              if count > left[g][c]:
+                  return False
+              spend += count * cheapest[g][c]
+      return spend <= budget
+
+  def bound(g, slots, budget):
+      # The most value groups g.. could add: the lesser of their best players
+      # on slots alone and the relaxed bound at the tuned rate.
+      if not slots:
+          return 0
+      by_slots = best_values[g][min(slots, len(best_values[g])) - 1] if best_values[g] else 0
+      by_rate = rate * budget + (best_net[g][min(slots, len(best_net[g])) - 1] if best_net[g] else 0)
+      return min(by_slots, by_rate)
+
+  # Values are whole multiples of their gcd, so a branch that cannot beat
+  # the best plan by at least that much cannot beat it at all.
+  step = (functools.reduce(math.gcd, value, 0) or 1) if all(isinstance(v, int) for v in value) else 0
+  need = tuple(needs.get(category, 0) for category in categories)
+  best = None  # (value, cost, path)
+  nodes = 0
+  stack = [(0, slots, budget, need, 0, 0, None)]
+  while stack:
+      g, slots_left, budget_left, need, total_value, total_cost, path = stack.pop()
+      nodes += 1
+      if nodes > PLAN_NODE_LIMIT:
+          break
+      if not feasible(g, slots_left, budget_left, need):
+          continue
+      if best is not None and total_value + bound(g, slots_left, budget_left) < best[0] + step:
+          continue
+      if g == group_count or not slots_left:
+          if not any(need) and (best is None or total_value > best[0]):
+              best = (total_value, total_cost, path)
+          continue
+      most = min(available[g], slots_left, budget_left // price[g] if price[g] else slots_left)
+      for take in range(most + 1):  # pushed last, taking the most is tried first
+          taken = list(need)
+          taken[cat[g]] = max(0, taken[cat[g]] - take)
+          stack.append((g + 1, slots_left - take, budget_left - take * price[g], tuple(taken),
+                        total_value + take * value[g], total_cost + take * price[g],
+                        (g, take, path) if take else path))
+  if best is None:
+      return None
+  picks = []
+  path = best[2]
+  while path is not None:
+      g, take, path = path
+      picks.extend((player, price[g]) for player in groups[keys[g]][:take])
+  return picks, best[1], best[0], nodes <= PLAN_NODE_LIMIT
+
+
+def _plan_embed(team_name, plan, slots, purse, basis):
+  if plan is None:
+      return discord.Embed(title=f"Plan for {team_name}", color=discord.Color.red(),
+                           description=f"No set of players in the pool meets those needs within {slots} open slots and ${purse:,}.")
+  picks, cost, value, exact = plan
+  description = (f"{len(picks)} players for {slots} open slots, ${cost:,} of ${purse:,} at {basis} prices "
+                 f"(${value:,} of base value).")
+  if not exact:
+      description += " The pool is too varied to prove this is the best plan; it is the best one found."
+  embed = discord.Embed(title=f"Plan for {team_name}", description=description, color=discord.Color.teal())
+  by_category = {}
+  for player, price in picks:
+      by_category.setdefault(normalize_category(player.get('category')), []).append((player, price))
+  for category, chosen in sorted(by_category.items(), key=lambda item: str(item[0])):
+      lines = [f"{player['name']}: ${price:,}" for player, price in sorted(chosen, key=lambda pick: -pick[1])[:PLAN_SHOWN]]
+      if len(chosen) > PLAN_SHOWN:
+          lines.append(f"...and {len(chosen) - PLAN_SHOWN} more.")
+      embed.add_field(name=f"{category} ({len(chosen)})", value="\n".join(lines)[:1024], inline=False)
+  return embed
+
+
+@bot.command(name='plan', help='Suggests the most valuable players your team can still afford from the auction list, predicting prices from how each category has sold so far ("base" uses base prices).\nUsage: !plan [team_name] [category=count ...] [base]\nExample: !plan "Dream Team" batsmen=2 bowlers=3')
+async def plan(ctx, *args):
+    session = await league(ctx)
+    team_name, needs, basis = session.owner_index.get(owner_key(ctx.author.id)), {}, 'predicted'
+    for arg in args:
+        if arg.lower() in ('base', 'predicted'):
+            basis = arg.lower()
+        elif '=' in arg:
+            category, _, count = arg.partition('=')
+            if normalize_category(category) not in CATEGORIES or not count.isdigit():
+                await ctx.send(f"Could not read '{arg}'. Use category=count, e.g. batsmen=2; categories are {', '.join(CATEGORIES)}.")
+                return
+            needs[normalize_category(category)] = int(count)
+        else:
+            team_name = arg
+    if team_name not in session.teams:
+        await ctx.send("Name a team, or create one to plan for your own." if team_name is None else f"Team '{team_name}' not found.")
+        return
 
-              owner = await ctx.bot.fetch_user(owner_id)
-              owner_name = owner.display_name if owner else "Unknown"
+    # Cached until the pool, the team (roster or purse) or, for predicted
+    # prices, the sale ledger changes.
+    team = session.teams[team_name]
+    key = ('plan', session.key, team_name, tuple(sorted(needs.items())), basis)
+    version = (session.players_for_auction.version, session.team_versions.get(team_name),
+               len(session.ledger) if basis == 'predicted' else None)
+    embed = RENDER_CACHE.get(key, version)
+    if embed is None:
+        slots, purse = max(0, team.max_size - len(team.players)), max(0, team.purse)
+        premiums = category_premiums(session.ledger) if basis == 'predicted' else None
+        result = await asyncio.to_thread(plan_roster, session.players_for_auction.to_list(), slots, purse, needs, premiums)
+        embed = RENDER_CACHE.put(key, version, _plan_embed(team_name, result, slots, purse, basis))
+    await ctx.send(embed=embed)
 
-              # purse format
-              formatted_purse = f"${purse:,.2f}"
 
-              # Prepare the embed message
-              embed = discord.Embed(title=f"Team: {team_name}", color=discord.Color.blue())
-              embed.add_field(name="Owner", value=owner_name, inline=False)
-              embed.add_field(name="Max Size", value=str(max_size), inline=True)
-              embed.add_field(name="Purse", value=formatted_purse, inline=True)
-              embed.add_field(name="Players", value=player_list, inline=False)
+#############################################################
+# Bulk import:
+#############################################################
+# Rows are read and validated IMPORT_BATCH_SIZE at a time in a worker thread,
+# so a big sheet never blocks the event loop. Supported shapes:
+#   .xlsx / .csv: category, first_name, last_name, base_price (header row first)
+#   .json:        {"players_for_auction": [{"name", "category", "base_price"}, ...]}
+#                 as in round_N_auction.json and combined_auction.json
+IMPORT_BATCH_SIZE = 500
+IMPORT_PROGRESS_INTERVAL = 2.0  # seconds between progress edits
+
+
+def _read_player_rows(filename, fp):
+  # Yields (row_number, category, name, base_price) without validating.
+  extension = os.path.splitext(filename)[1].lower()
+  if extension == '.xlsx':
+      # openpyxl is slow to import and only spreadsheets need it.
+      from openpyxl import load_workbook
+      workbook = load_workbook(filename=fp, read_only=True, data_only=True)
+      try:
+          for row_number, row in enumerate(workbook.active.iter_rows(min_row=2, values_only=True), start=2):
+              if not any(cell is not None for cell in row):
+                  continue
+              category, first_name, last_name, base_price = (tuple(row) + (None,) * 4)[:4]
+              yield row_number, category, f"{first_name or ''} {last_name or ''}".strip(), base_price
+      finally:
+          workbook.close()
+  elif extension == '.csv':
+      reader = csv.reader(io.TextIOWrapper(fp, encoding='utf-8-sig', newline=''))
+      next(reader, None)
+      for row_number, row in enumerate(reader, start=2):
+          if not any(cell.strip() for cell in row):
+              continue
+          category, first_name, last_name, base_price = (row + [''] * 4)[:4]
+          yield row_number, category, f"{first_name.strip()} {last_name.strip()}".strip(), base_price
+  elif extension == '.json':
+      text = fp.read()
+      if isinstance(text, bytes):
+          text = text.decode('utf-8-sig')
+      text = text.strip()
+      if not text.startswith(('{', '[')):
+          # unsold.json is a bare '"unsold": [...],' fragment of a larger object.
+          text = '{' + text.rstrip(',') + '}'
+      data = json.loads(text)
+      players = (data.get('players_for_auction') or data.get('unsold', [])) if isinstance(data, dict) else data
+      for index, player in enumerate(players, start=1):
+          yield index, player.get('category'), str(player.get('name') or '').strip(), player.get('base_price')
+  else:
+      raise ValueError(f"Unsupported file type '{extension}'. Use .xlsx, .csv or .json.")
+
+def _validate_player_row(category, name, base_price):
+  # Returns (player, None) for a good row or (None, reason) for a bad one.
+  if not name:
+      return None, "missing player name"
+  canonical = normalize_category(category)
+  if canonical not in CATEGORIES:
+      return None, f"invalid category '{category}'"
+  try:
+      base_price = int(float(base_price))
+  except (TypeError, ValueError):
+      return None, f"invalid base price '{base_price}'"
+  if base_price <= 0:
+      return None, f"base price must be positive, got {base_price}"
+  return {"name": name, "category": canonical, "base_price": base_price}, None
+
+def _next_import_batch(rows):
+  # Runs in a worker thread: pulls and validates the next batch of rows.
+  batch = []
+  for row_number, category, name, base_price in rows:
+      player, error = _validate_player_row(category, name, base_price)
+      batch.append((row_number, player, error))
+      if len(batch) >= IMPORT_BATCH_SIZE:
+          break
+  return batch
+
+
+async def import_players(session, filename, fp, progress=None):
+  """Streams, validates and dedupes players, then commits them as one event.
+
+  Returns (added, duplicates, errors) where errors is a list of
+  (row_number, reason). progress, if given, is awaited with the number of
+  rows read so far.
+  """
+  rows = _read_player_rows(filename, fp)
+  added, duplicates, errors = [], 0, []
+  seen = set()
+  rows_read = 0
+  last_progress = time.monotonic()
+  try:
+      while True:
+          batch = await asyncio.to_thread(_next_import_batch, rows)
+          if not batch:
+              break
+          for row_number, player, error in batch:
+              if error:
+                  errors.append((row_number, error))
+                  continue
+              name = player['name']
+              if name in seen or session.knows_player(name):
+                  duplicates += 1
+                  continue
+              seen.add(name)
+              added.append(player)
+          rows_read += len(batch)
+          if progress and time.monotonic() - last_progress >= IMPORT_PROGRESS_INTERVAL:
+              last_progress = time.monotonic()
+              await progress(rows_read)
+  finally:
+      await asyncio.to_thread(rows.close)
+  if added:
+      session.commit('add_auction_players', players=added)
+  return added, duplicates, errors
 
-              await ctx.send(embed=embed)
-              pprint.pprint(USERS)
-          else:
-              await ctx.send(f"Team '{team_name}' not found.")
 
 
 
+#############################################################
+# Bulk admin:
+#############################################################
+# !bulk takes one line per change, from the message or an attached text
+# file, in the argument order of the single commands:
+#   create_team "Dream Team" @owner [max_size] [purse]
+#   set_purse @owner 500000
+#   add_player_for_auction Batsmen John Doe 50000
+#   add_player_to_team "Dream Team" John Doe
+# !bulk teams / purses / players / roster take lines without the command
+# name. Every line is checked against the league plus the lines before it;
+# if any line fails nothing is applied, otherwise the whole script is one
+# 'batch' event: one journal line or one SQLite transaction, one reply.
+BULK_ERRORS_SHOWN = 15
+_MENTION = re.compile(r'<@!?(\d+)>|(\d+)')
+
+
+def _bulk_user(token):
+  match = _MENTION.fullmatch(token)
+  if match is None:
+      raise ValueError(f"'{token}' is not a user mention or ID")
+  return int(match.group(1) or match.group(2))
+
+def _bulk_amount(token, what):
+  try:
+      amount = int(token.replace(',', ''))
+  except ValueError:
+      raise ValueError(f"invalid {what} '{token}'")
+  if amount < 0:
+      raise ValueError(f"{what} cannot be negative")
+  return amount
+
+
+class BulkPlan:
+  """Validates bulk lines against the league and the lines before them.
+
+  Nothing touches the session until commit(), which applies every
+  accepted line as one 'batch' event.
+  """
+
+  def __init__(self, session):
+      self.session = session
+      self.events = []
+      self.errors = []  # (line_number, reason)
+      self.new_teams = {}  # team -> max_size
+      self.owners = set()
+      self.purses_set = set()  # owners given a balance by earlier lines
+      # (team, owner, purse) for new teams whose owner keeps an existing
+      # balance, so the summary can say which purse applied.
+      self.kept_balances = []
+      self.roster_sizes = Counter()
+      self.rostered = set()
+      self.queued = set()
+
+  def add(self, line_number, op, args):
+      try:
+          event = getattr(self, '_check_' + op)(args)
+      except ValueError as e:
+          self.errors.append((line_number, str(e)))
+      else:
+          self.events.append(event)
+
+  def counts(self):
+      return Counter(event['op'] for event in self.events)
+
+  def commit(self):
+      if self.events and not self.errors:
+          self.session.commit('batch', events=self.events)
+
+  def _team_size(self, team_name):
+      if team_name in self.new_teams:
+          return self.roster_sizes[team_name], self.new_teams[team_name]
+      team = self.session.teams[team_name]
+      return len(team.players) + self.roster_sizes[team_name], team.max_size
+
+  def _check_create_team(self, args):
+      if not 2 <= len(args) <= 4:
+          raise ValueError("expected: team_name owner [max_size] [purse]")
+      team_name, owner = args[0], _bulk_user(args[1])
+      max_size = _bulk_amount(args[2], 'max size') if len(args) > 2 else MAX_TEAM_SIZE
+      purse = _bulk_amount(args[3], 'purse') if len(args) > 3 else MAX_PURSE
+      if team_name in self.session.teams or team_name in self.new_teams:
+          raise ValueError(f"team '{team_name}' already exists")
+      if owner_key(owner) in self.session.owner_index or owner_key(owner) in self.owners:
+          raise ValueError(f"<@{owner}> already owns a team")
+      if not max_size:
+          raise ValueError("max size must be at least 1")
+      self.new_teams[team_name] = max_size
+      self.owners.add(owner_key(owner))
+      if owner_key(owner) in self.session.purses or owner_key(owner) in self.purses_set:
+          self.kept_balances.append((team_name, owner_key(owner), purse))
+      return {'op': 'create_team', 'team': team_name, 'owner': owner_key(owner), 'max_size': max_size, 'purse': purse, 'ts': time.time()}
+
+  def _check_set_purse(self, args):
+      if len(args) != 2:
+          raise ValueError("expected: user amount")
+      owner, amount = owner_key(_bulk_user(args[0])), _bulk_amount(args[1], 'amount')
+      self.purses_set.add(owner)
+      return {'op': 'set_purse', 'user': owner, 'amount': amount, 'ts': time.time()}
+
+  def _check_add_player_for_auction(self, args):
+      # category first last base_price, or category "full name" base_price
+      if len(args) < 3:
+          raise ValueError("expected: category first_name last_name base_price")
+      player, error = _validate_player_row(args[0], " ".join(args[1:-1]), args[-1].replace(',', ''))
+      if error:
+          raise ValueError(error)
+      if player['name'] in self.session.players_for_auction or player['name'] in self.queued:
+          raise ValueError(f"{player['name']} is already in the auction list")
+      self.queued.add(player['name'])
+      return {'op': 'add_auction_player', 'player': player}
+
+  def _check_add_player_to_team(self, args):
+      if len(args) < 2:
+          raise ValueError("expected: team_name player_name")
+      team_name, player_name = args[0], " ".join(args[1:])
+      if team_name not in self.session.teams and team_name not in self.new_teams:
+          raise ValueError(f"team '{team_name}' does not exist")
+      size, max_size = self._team_size(team_name)
+      if size >= max_size:
+          raise ValueError(f"team '{team_name}' is at maximum capacity")
+      if player_name in self.session.player_index or player_name in self.rostered:
+          raise ValueError(f"{player_name} is already on a team")
+      self.roster_sizes[team_name] += 1
+      self.rostered.add(player_name)
+      return {'op': 'add_player_to_team', 'team': team_name, 'player': player_name}
+
+
+BULK_COMMANDS = ('create_team', 'set_purse', 'add_player_for_auction', 'add_player_to_team')
+
+
+async def _bulk_lines(ctx, text):
+  # The message text plus any attached text files, as (line_number, line),
+  # or None (after saying why) if an attachment is not UTF-8 text.
+  chunks = [text]
+  for attachment in ctx.message.attachments:
+      try:
+          chunks.append((await attachment.read()).decode('utf-8-sig'))
+      except UnicodeDecodeError as e:
+          await ctx.send(f"Could not read {attachment.filename}: not UTF-8 text (byte {e.start}); nothing was applied.")
+          return None
+  lines = "\n".join(chunks).splitlines()
+  return [(number, line.strip()) for number, line in enumerate(lines, start=1)
+          if line.strip() and not line.strip().startswith(('#', '```'))]
+
+async def run_bulk(ctx, text, op=None):
+  session = await league(ctx)
+  lines = await _bulk_lines(ctx, text)
+  if lines is None:
+      return
+  plan = BulkPlan(session)
+  for line_number, line in lines:
+      try:
+          args = shlex.split(line)
+      except ValueError as e:
+          plan.errors.append((line_number, str(e)))
+          continue
+      if not any(args):
+          # Only quotes, e.g. "" on a line of its own.
+          plan.errors.append((line_number, "nothing but empty quotes"))
+          continue
+      line_op = op
+      if line_op is None:
+          line_op = args.pop(0) if args[0] in BULK_COMMANDS else None
+          if line_op is None:
+              plan.errors.append((line_number, f"unknown command '{args[0]}'"))
+              continue
+      plan.add(line_number, line_op, args)
+
+  if not plan.events and not plan.errors:
+      await ctx.send("Nothing to apply: put one change per line after the command, or attach a text file.")
+      return
+  plan.commit()
+  counts = plan.counts()
+  if plan.errors:
+      embed = discord.Embed(title="Bulk changes rejected", color=discord.Color.red(),
+                            description=f"{len(plan.errors)} of {len(plan.errors) + len(plan.events)} lines failed; nothing was applied.")
+      shown = [f"Line {line_number}: {reason}" for line_number, reason in plan.errors[:BULK_ERRORS_SHOWN]]
+      if len(plan.errors) > BULK_ERRORS_SHOWN:
+          shown.append(f"...and {len(plan.errors) - BULK_ERRORS_SHOWN} more.")
+      embed.add_field(name="Errors", value="\n".join(shown)[:1024], inline=False)
+  else:
+      embed = discord.Embed(title="Bulk changes applied", color=discord.Color.green(),
+                            description=f"Applied {len(plan.events)} lines in one step.")
+      labels = {'create_team': "Teams", 'set_purse': "Purses", 'add_auction_player': "Auction players", 'add_player_to_team': "Rostered players"}
+      for event_op, label in labels.items():
+          if counts[event_op]:
+              embed.add_field(name=label, value=str(counts[event_op]))
+      kept = [f"{team_name}: ${session.purses.balance(owner):,} (not ${purse:,})"
+              for team_name, owner, purse in plan.kept_balances if session.purses.balance(owner) != purse]
+      if kept:
+          embed.add_field(name="Owners kept their existing balance", value="\n".join(kept)[:1024], inline=False)
+  await ctx.send(embed=embed)
+
+
+@bot.group(name='bulk', invoke_without_command=True, help='Applies many admin changes at once, one per line, from the message or an attached text file. Nothing is applied if any line fails.\nUsage: !bulk followed by lines of create_team, set_purse, add_player_for_auction or add_player_to_team with their usual arguments\nExample:\n!bulk\ncreate_team "Dream Team" @JohnDoe 11 100000\nadd_player_for_auction Batsmen John Doe 50000')
+@commands.has_permissions(administrator=True)
+async def bulk(ctx, *, text: str = ''):
+    await run_bulk(ctx, text)
+
+@bulk.command(name='teams', help='Creates teams, one per line: team_name owner [max_size] [purse]\nExample: !bulk teams\n"Dream Team" @JohnDoe 11 100000')
+@commands.has_permissions(administrator=True)
+async def bulk_teams(ctx, *, text: str = ''):
+    await run_bulk(ctx, text, 'create_team')
+
+@bulk.command(name='purses', help='Sets purses, one per line: user amount\nExample: !bulk purses\n@JohnDoe 500000')
+@commands.has_permissions(administrator=True)
+async def bulk_purses(ctx, *, text: str = ''):
+    await run_bulk(ctx, text, 'set_purse')
+
+@bulk.command(name='players', help='Adds players to the auction list, one per line: category first_name last_name base_price\nExample: !bulk players\nBatsmen John Doe 50000')
+@commands.has_permissions(administrator=True)
+async def bulk_players(ctx, *, text: str = ''):
+    await run_bulk(ctx, text, 'add_player_for_auction')
+
+@bulk.command(name='roster', help='Adds players to teams, one per line: team_name player_name\nExample: !bulk roster\n"Dream Team" John Doe')
+@commands.has_permissions(administrator=True)
+async def bulk_roster(ctx, *, text: str = ''):
+    await run_bulk(ctx, text, 'add_player_to_team')
+
+
+#############################################################
+# Rounds:
+#############################################################
+# Round pools ship next to the bot as round_N_auction.json, together with
+# combined_auction.json and the older unsold.json. A round is named by its
+# number, 'combined' or 'unsold'. Each file is parsed once and cached by
+# mtime and size, so switching rounds never re-reads an unchanged file.
+ROUND_DIR = os.environ.get('ROUND_DIR', '.')
+NAMED_ROUND_FILES = {'combined': 'combined_auction.json', 'unsold': 'unsold.json'}
+
+
+def round_path(name):
+  name = name.lower()
+  if name.isdigit():
+      return os.path.join(ROUND_DIR, f"round_{int(name)}_auction.json")
+  if name in NAMED_ROUND_FILES:
+      return os.path.join(ROUND_DIR, NAMED_ROUND_FILES[name])
+  return None
+
+
+class RoundCache:
+  def __init__(self):
+      self._entries = {}  # path -> ((mtime_ns, size), players, errors)
+
+  def load(self, path):
+      # Runs in a worker thread. Returns (players, errors); players is a
+      # validated, deduplicated tuple shared by every league.
+      stat = os.stat(path)
+      stamp = (stat.st_mtime_ns, stat.st_size)
+      entry = self._entries.get(path)
+      if entry is None or entry[0] != stamp:
+          players, errors, seen = [], [], set()
+          with open(path, 'rb') as fp:
+              for row_number, category, name, base_price in _read_player_rows(path, fp):
+                  player, error = _validate_player_row(category, name, base_price)
+                  if error:
+                      errors.append((row_number, error))
+                  elif player['name'] not in seen:
+                      seen.add(player['name'])
+                      players.append(player)
+          entry = self._entries[path] = (stamp, tuple(players), errors)
+      return entry[1], entry[2]
+
+  def available(self):
+      numbers = sorted(int(os.path.basename(path).split('_')[1])
+                       for path in glob.glob(os.path.join(ROUND_DIR, 'round_*_auction.json'))
+                       if os.path.basename(path).split('_')[1].isdigit())
+      named = [name for name, filename in NAMED_ROUND_FILES.items() if os.path.exists(os.path.join(ROUND_DIR, filename))]
+      return [str(number) for number in numbers] + named
+
+
+ROUND_CACHE = RoundCache()
+
+
 #############################################################
 # player logics:
 #############################################################
 @bot.command(name='add_player_for_auction', help='Adds a player to the auction list with a specified category, first name, last name, and base price.\nUsage: !add_player_for_auction [category] [first_name] [last_name] [base_price]\nExample: !add_player_for_auction "Batsman" "John" "Doe" 50000')
 async def add_player_for_auction(ctx, category: str, first_name: str, last_name: str, base_price: int):
-    if category not in ["Batsmen", "Allrounders", "Bowlers"]:
+    session = await league(ctx)
+    if category not in CATEGORIES:
         await ctx.send("Invalid category. Choose from Batsmen, Allrounders, Bowlers.")
         return
     player = {"name": f"{first_name} {last_name}", "category": category, "base_price": base_price}
-    PLAYERS_FOR_AUCTION.append(player)
-    save_data()
+    if player['name'] in session.players_for_auction:
+        await ctx.send(f"{player['name']} is already in the auction list.")
+        return
+    session.commit('add_auction_player', player=player)
     await ctx.send(f"Added {player['name']} to the auction list.")
 
-@bot.command(name='load_players_from_excel')
-async def load_players_from_excel(ctx, file_path: str):
-    workbook = load_workbook(filename=file_path)
-    sheet = workbook.active
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        category, first_name, last_name, base_price = row
-        PLAYERS_FOR_AUCTION.append({"name": f"{first_name} {last_name}", "category": category, "base_price": base_price})
-    await ctx.send("Players loaded from Excel.")
+@bot.command(name='load_players_from_excel', aliases=['import_players'], help='Imports players for auction from an .xlsx, .csv or round/combined .json file, given as a path or an attachment.\nUsage: !load_players_from_excel [file_path]\nExample: !load_players_from_excel round_1_auction.json')
+@commands.has_permissions(administrator=True)
+async def load_players_from_excel(ctx, file_path: str = None):
+    session = await league(ctx)
+    if ctx.message.attachments:
+        attachment = ctx.message.attachments[0]
+        filename, fp = attachment.filename, io.BytesIO(await attachment.read())
+    elif file_path:
+        try:
+            filename, fp = file_path, open(file_path, 'rb')
+        except OSError as e:
+            await ctx.send(f"Could not open {file_path}: {e.strerror}.")
+            return
+    else:
+        await ctx.send("Give a file path or attach an .xlsx, .csv or .json file.")
+        return
+
+    status = await ctx.send(f"Importing players from {filename}...")
+
+    async def progress(rows_read):
+        await status.edit(content=f"Importing players from {filename}... {rows_read} rows read.")
+
+    try:
+        added, duplicates, errors = await import_players(session, filename, fp, progress)
+    except Exception as e:
+        await status.edit(content=f"Import from {filename} failed: {e}")
+        return
+    finally:
+        fp.close()
+
+    summary = [f"Imported {len(added)} players from {filename}."]
+    if duplicates:
+        summary.append(f"Skipped {duplicates} players already in the pool, unsold list or a roster.")
+    if errors:
+        summary.append(f"{len(errors)} rows had errors:")
+        summary.extend(f"- row {row_number}: {reason}" for row_number, reason in errors[:15])
+        if len(errors) > 15:
+            summary.append(f"...and {len(errors) - 15} more.")
+    await status.edit(content="\n".join(summary))
 
 @bot.command(name='remove_player_from_auction', help='Removes a specified player from the auction list or removes all players if specified.\nUsage: !remove_player_from_auction [player_name | ALL]\nExample: !remove_player_from_auction "John Doe", !remove_player_from_auction ALL')
 async def remove_player_from_auction(ctx, player_name: str):
-    global PLAYERS_FOR_AUCTION  
+    session = await league(ctx)
 
     # Check if we're removing all players
     if player_name.upper() == 'ALL':
-        PLAYERS_FOR_AUCTION = []  # Clear the list
+        session.commit('clear_auction')  # Clear the list
         await ctx.send("All players have been removed from the auction.")
-        save_data()  
         return
 
     # Find and remove the specified player
-    for player in PLAYERS_FOR_AUCTION:
-        if player_name == player['name']:
-            PLAYERS_FOR_AUCTION.remove(player)
-            await ctx.send(f"Removed {player_name} from the auction.")
-            save_data()  
-            return
+    if player_name in session.players_for_auction:
+        session.commit('remove_auction_player', name=player_name)
+        await ctx.send(f"Removed {player_name} from the auction.")
+        return
 
     # If the player was not found
     await ctx.send(f"Player {player_name} not found in the auction.")
 
-@bot.command(name='view_auction_players', help='Displays the list of players currently available for auction.')
-async def view_auction_players(ctx):
-    if not PLAYERS_FOR_AUCTION:
-        await ctx.send("There are currently no players listed for auction.")
+@bot.command(name='requeue_unsold', help='Moves every unsold player to the back of the auction list as a new round.')
+@commands.has_permissions(administrator=True)
+async def requeue_unsold(ctx):
+    session = await league(ctx)
+    if not session.unsold_players:
+        await ctx.send("There are no unsold players to requeue.")
+        return
+    count = len(session.unsold_players)
+    round_label = f"unsold-{sum(1 for label in session.rounds if label.startswith('unsold-')) + 1}"
+    session.commit('requeue_unsold', round=round_label)
+    await ctx.send(f"Requeued {count} unsold players for auction as round {round_label}.")
+
+@bot.command(name='rounds', help='Lists the round files that can be queued and the rounds this league has queued so far.')
+async def rounds(ctx):
+    session = await league(ctx)
+    lines = []
+    for name in ROUND_CACHE.available():
+        players, _ = await asyncio.to_thread(ROUND_CACHE.load, round_path(name))
+        new = sum(1 for player in players if not session.knows_player(player['name']))
+        lines.append(f"Round {name}: {len(players)} players, {new} not yet in this league")
+    if not lines:
+        lines.append("No round files found.")
+    lines.append(f"Queued so far: {', '.join(session.rounds) or 'none'}")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name='queue_round', help='Queues a round behind the current auction list, skipping players already rostered, queued or unsold.\nUsage: !queue_round [round]\nExample: !queue_round 2 (or combined, unsold)')
+@commands.has_permissions(administrator=True)
+async def queue_round(ctx, round_name: str):
+    session = await league(ctx)
+    path = round_path(round_name)
+    if path is None or not os.path.exists(path):
+        await ctx.send(f"Unknown round '{round_name}'. Available: {', '.join(ROUND_CACHE.available()) or 'none'}.")
+        return
+    try:
+        players, errors = await asyncio.to_thread(ROUND_CACHE.load, path)
+    except (OSError, ValueError) as e:
+        await ctx.send(f"Could not read {os.path.basename(path)}: {e}")
         return
 
-    # Constructing the message
-    players_list = []
-    for player in PLAYERS_FOR_AUCTION:
-        player_info = f"**Name**: {player['name']}, **Category**: {player['category']}, **Base Price**: {player['base_price']}"
-        players_list.append(player_info)
-
-    # Splitting the message if it's too long for one Discord message
-    message_chunks = [players_list[i:i + 10] for i in range(0, len(players_list), 10)]  # Split list into chunks of 10
+    added = [dict(player) for player in players if not session.knows_player(player['name'])]
+    if added:
+        session.commit('queue_round', round=round_name.lower(), players=added)
+    message = f"Queued {len(added)} players from round {round_name} behind {len(session.players_for_auction) - len(added)} already in the pool."
+    if len(players) > len(added):
+        message += f" Skipped {len(players) - len(added)} already rostered, queued or unsold."
+    if errors:
+        message += f" Skipped {len(errors)} invalid rows."
+    await ctx.send(message)
+
+@bot.command(name='view_auction_players', help='Displays the list of players currently available for auction, one page at a time.\nUsage: !view_auction_players [category]\nExample: !view_auction_players Bowlers')
+async def view_auction_players(ctx, category: str = None):
+    session = await league(ctx)
+    if not session.players_for_auction:
+        await ctx.send("There are currently no players listed for auction.")
+        return
+    if category is not None:
+        category = normalize_category(category)
+        if category not in CATEGORIES:
+            await ctx.send("Invalid category. Choose from Batsmen, Allrounders, Bowlers.")
+            return
 
-    for chunk in message_chunks:
-        embed = discord.Embed(title="Auction Players List", description="\n".join(chunk), color=discord.Color.blue())
-        await ctx.send(embed=embed)
+    view = AuctionPlayersPaginator(session, category)
+    await ctx.send(embed=view.render(), view=view)
 
 @bot.command(name='trade', help='Trade a player from one team to another.\nUsage: !trade [from_team] [to_team] [player_name]')
 async def trade(ctx, from_team: str, to_team: str, player_name: str):
+    session = await league(ctx)
     # Validate both teams exist
-    if from_team not in TEAMS or to_team not in TEAMS:
+    if from_team not in session.teams or to_team not in session.teams:
         await ctx.send(f"One or both of the teams specified do not exist.")
         return
 
     # Validate the player is on the from_team
-    if player_name not in TEAMS[from_team]['players']:
+    if session.player_index.get(player_name) != from_team:
         await ctx.send(f"Player '{player_name}' is not on Team '{from_team}'.")
-        return10
+        return
+    if session.teams[to_team].is_full():
+        await ctx.send(f"Team '{to_team}' is at maximum capacity.")
+        return
 
     # Perform the trade
-    TEAMS[from_team]['players'].remove(player_name)
-    TEAMS[to_team]['players'].append(player_name)
-    save_data()
+    session.commit('trade', from_team=from_team, to_team=to_team, player=player_name)
 
     # Confirm the trade to the user
     await ctx.send(f"Player '{player_name}' has been successfully traded from Team '{from_team}' to Team '{to_team}'.")
@@ -332,37 +3141,635 @@ async def trade(ctx, from_team: str, to_team: str, player_name: str):
 
 
 
+#############################################################
+# Bid engine:
+#############################################################
+BID_RENDER_INTERVAL = float(os.environ.get('BID_RENDER_INTERVAL', 1.0))
+
+
+class BidEngine:
+  """Serializes bids for one auction and coalesces the message edits.
+
+  Each click is acknowledged at once with a deferred response and queued.
+  A single worker applies queued bids strictly in arrival order through
+  view.apply_bid(), and the auction message is edited at most once per
+  render_interval, always showing the latest state.
+  """
+
+  def __init__(self, view, render_interval=BID_RENDER_INTERVAL):
+      self.view = view
+      self.render_interval = render_interval
+      # Swappable so the offline benchmark can run on a simulated clock.
+      self.clock = time.monotonic
+      self.sleep = asyncio.sleep
+      self.message = None
+      # Counts for the open lot; reset_stats() starts the next lot's.
+      self.accepted = 0
+      self.rejected = 0
+      self.coalesced = 0
+      self._queue = asyncio.Queue()
+      self._worker = None
+      self._render_task = None
+      self._last_render = float('-inf')
+
+  async def submit(self, interaction):
+      if interaction.message is not None:
+          self.message = interaction.message
+      await interaction.response.defer()
+      if self._worker is None or self._worker.done():
+          self._worker = asyncio.create_task(self._run())
+      self._queue.put_nowait((interaction, time.perf_counter()))
+
+  async def drain(self, render=True):
+      # Wait for every queued bid to be applied. With render=True the
+      # pending update is shown now; otherwise it is dropped because the
+      # caller is about to replace the message content itself.
+      await self._queue.join()
+      pending = self._render_task
+      self._render_task = None
+      if pending is not None and not pending.done():
+          pending.cancel()
+          if render:
+              await self._render()
+
+  def refresh(self):
+      # Show a change made outside the queue (e.g. a new max bid).
+      self._schedule_render()
+
+  def close(self):
+      # The auction is over: stop the worker and any pending edit.
+      for task in (self._worker, self._render_task):
+          if task is not None and not task.done():
+              task.cancel()
+
+  def stats(self):
+      return {'accepted': self.accepted, 'rejected': self.rejected, 'coalesced': self.coalesced}
+
+  def reset_stats(self):
+      self.accepted = self.rejected = self.coalesced = 0
+
+  async def _run(self):
+      while True:
+          interaction, clicked_at = await self._queue.get()
+          METRICS.observe('bid_queue_seconds', time.perf_counter() - clicked_at)
+          try:
+              error = self.view.apply_bid(interaction.user)
+              if error:
+                  self.rejected += 1
+                  METRICS.inc('bids_total', outcome='rejected')
+                  await interaction.followup.send(error, ephemeral=True)
+              else:
+                  self.accepted += 1
+                  METRICS.inc('bids_total', outcome='accepted')
+                  self.view.apply_proxies()
+                  self.view.extend_lot()
+                  self.view.checkpoint()
+                  self._schedule_render()
+          except Exception as e:
+              log.exception("Error applying bid: %s", e)
+          finally:
+              self._queue.task_done()
+
+  def _schedule_render(self):
+      if self._render_task is not None and not self._render_task.done():
+          # An edit is already due and will pick up this bid too.
+          self.coalesced += 1
+          METRICS.inc('bid_renders_coalesced_total')
+          return
+      delay = max(0.0, self._last_render + self.render_interval - self.clock())
+      self._render_task = asyncio.create_task(self._render_after(delay))
+
+  async def _render_after(self, delay):
+      if delay:
+          await self.sleep(delay)
+      # Bids that land while the edit is in flight schedule the next one.
+      self._render_task = None
+      await self._render()
+
+  async def _render(self):
+      self._last_render = self.clock()
+      if self.message is None:
+          return
+      try:
+          await self.message.edit(content=self.view.bid_message(), view=self.view)
+      except discord.HTTPException as e:
+          log_sampled(logging.WARNING, 'auction_edit_failed', "Could not update the auction message: %s", e)
+
+
+#############################################################
+# Lot timers:
+#############################################################
+# Timed lots: a lot closes by itself LOT_SECONDS after it opens, announcing
+# "going once" and "going twice" during the last SOFT_CLOSE_SECONDS, and any
+# accepted bid in that window pushes the close back to SOFT_CLOSE_SECONDS
+# from the bid. Leagues choose their own values with !lot_timer; 0 seconds
+# leaves lots to the Sold/Next buttons.
+LOT_SECONDS = int(os.environ.get('LOT_SECONDS', 0))
+SOFT_CLOSE_SECONDS = int(os.environ.get('SOFT_CLOSE_SECONDS', 10))
+
+
+class TimerScheduler:
+  """Every pending lot timer in the process, on one heap and one task.
+
+  schedule() replaces the key's pending timer; replaced and cancelled
+  entries stay in the heap and are skipped when they surface (the heap is
+  rebuilt if they pile up). The single runner task sleeps until the
+  earliest deadline or until an earlier one is scheduled. Coroutine
+  callbacks get their own short-lived task so a slow Discord call never
+  delays other lots.
+  """
+
+  def __init__(self, clock=time.monotonic):
+      self.clock = clock
+      self._heap = []  # (when, token, key, callback)
+      self._live = {}  # key -> token of its pending entry
+      self._tokens = itertools.count()
+      self._wakeup = None
+      self._runner = None
+      self._running = set()
+      self.fired = 0
+
+  def __len__(self):
+      return len(self._live)
+
+  def schedule(self, key, when, callback):
+      token = next(self._tokens)
+      self._live[key] = token
+      earliest = self._heap[0][0] if self._heap else None
+      heapq.heappush(self._heap, (when, token, key, callback))
+      if len(self._heap) > 2 * len(self._live) + 64:
+          self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[1]]
+          heapq.heapify(self._heap)
+      if self._runner is None or self._runner.done():
+          self._wakeup = asyncio.Event()
+          self._runner = asyncio.create_task(self._run())
+      elif earliest is None or when < earliest:
+          self._wakeup.set()
+
+  def cancel(self, key):
+      self._live.pop(key, None)
+
+  async def _run(self):
+      while self._live:
+          now = self.clock()
+          while self._heap and (self._live.get(self._heap[0][2]) != self._heap[0][1] or self._heap[0][0] <= now):
+              when, token, key, callback = heapq.heappop(self._heap)
+              if self._live.get(key) != token:
+                  continue
+              del self._live[key]
+              self._fire(callback)
+          if not self._heap:
+              break
+          self._wakeup.clear()
+          try:
+              await asyncio.wait_for(self._wakeup.wait(), self._heap[0][0] - now)
+          except asyncio.TimeoutError:
+              pass
+
+  def _fire(self, callback):
+      self.fired += 1
+      try:
+          result = callback()
+      except Exception:
+          log.exception("Lot timer callback failed")
+          return
+      if asyncio.iscoroutine(result):
+          task = asyncio.create_task(result)
+          self._running.add(task)
+          task.add_done_callback(self._running.discard)
+
+
+LOT_TIMERS = TimerScheduler()
+
+
+@bot.command(name='lot_timer', help=f'Closes lots automatically after a number of seconds, with a soft close: a bid in the last seconds extends the lot.\nUsage: !lot_timer [seconds] [soft_close_seconds]\nExample: !lot_timer 60 {SOFT_CLOSE_SECONDS} (0 turns timed lots off)')
+@commands.has_permissions(administrator=True)
+async def lot_timer(ctx, seconds: int, soft_close: int = SOFT_CLOSE_SECONDS):
+    session = await league(ctx)
+    if seconds < 0 or soft_close < 0:
+        await ctx.send("Timer values cannot be negative.")
+        return
+    session.commit('set_timer', seconds=seconds, soft_close=soft_close)
+    if seconds:
+        await ctx.send(f"Lots now close after {seconds}s; a bid in the last {soft_close}s extends the lot to {soft_close}s from that bid. Applies from the next lot.")
+    else:
+        await ctx.send("Timed lots are off; lots close with the Sold and Next Player buttons.")
+
+
+#############################################################
+# Proxy bidding:
+#############################################################
+# Owners can leave a private max bid for one player or for a whole
+# category. After every accepted bid (and when a lot opens) the standing
+# max bids are settled in one step, as if their owners had kept clicking:
+# the highest max wins, one increment above the runner-up's best bid, so
+# only the clearing price is shown in the channel.
+def resolve_proxies(session, player, current_bid, leader_id, hold=None):
+  """Settles every max bid standing on player against the current high bid.
+
+  Returns (owner, price, bidders) for the new high bid, or None if no max
+  bid changes the lot. Bids move in the player's increment tier and each
+  max is capped by what its owner has not committed to other lots (hold is
+  this lot); owners without a team or with a full team are skipped. Equal maxes go to the one registered first.
+  """
+  if not session.proxies:
+      return None
+  increment = bid_increment(player.get('base_price', 0))
+  category = normalize_category(player.get('category'))
+  leader = owner_key(leader_id) if leader_id is not None else None
+
+  # A player-level max overrides the same owner's category max.
+  maxes = {}
+  for (owner, scope, target), (amount, order) in session.proxies.items():
+      if scope == 'player' and target == player['name']:
+          maxes[owner] = (amount, order)
+      elif scope == 'category' and target == category:
+          maxes.setdefault(owner, (amount, order))
+
+  contenders = []  # heap of (-highest reachable bid, order, owner)
+  for owner, (amount, order) in maxes.items():
+      team_name = session.owner_index.get(owner)
+      if team_name is None or owner not in session.purses:
+          continue
+      if session.teams[team_name].is_full():
+          continue
+      cap = min(amount, session.purses.available(owner, hold))
+      if cap < current_bid + (0 if owner == leader else increment):
+          continue
+      reachable = current_bid + (cap - current_bid) // increment * increment
+      heapq.heappush(contenders, (-reachable, order, owner))
+  if leader is not None and leader not in {owner for _, _, owner in contenders}:
+      heapq.heappush(contenders, (-current_bid, -1, leader))
+  if not contenders:
+      return None
+
+  top, _, winner = heapq.heappop(contenders)
+  runner = contenders[0] if contenders else None
+  if winner == leader:
+      if runner is None:
+          return None
+      price = min(-top, -runner[0] + increment)
+  else:
+      price = current_bid + increment
+      if runner is not None:
+          price = min(-top, max(price, -runner[0] + increment))
+  if price <= current_bid:
+      return None
+  bidders = [winner] + ([runner[2]] if runner is not None else [])
+  return winner, price, bidders
+
+
+class MaxBidModal(discord.ui.Modal, title='Set a max bid'):
+  amount = discord.ui.TextInput(label='Max bid (0 withdraws it)', max_length=12)
+  target = discord.ui.TextInput(label='For: player up (blank), a player or category', required=False, max_length=100)
+
+  def __init__(self, auction):
+      super().__init__()
+      self.auction = auction
+
+  @timed_callback('max_bid_submit')
+  async def on_submit(self, interaction: discord.Interaction):
+      view = self.auction
+      session = view.session
+      owner = owner_key(interaction.user.id)
+      if owner not in session.owner_index or owner not in session.purses:
+          await interaction.response.send_message("You need a team and a purse to bid.", ephemeral=True)
+          return
+      try:
+          amount = int(str(self.amount.value).replace(',', '').replace('$', '').strip())
+      except ValueError:
+          await interaction.response.send_message("Please enter a whole number.", ephemeral=True)
+          return
+      if amount < 0:
+          await interaction.response.send_message("A max bid cannot be negative.", ephemeral=True)
+          return
+
+      # Under the lot lock, so the lot cannot be sold or moved on while the
+      # max bid is checked against it and applied.
+      async with view.lot_lock:
+          reply = self._apply(view, session, owner, amount, str(self.target.value or '').strip())
+      await interaction.response.send_message(reply, ephemeral=True)
+
+  def _apply(self, view, session, owner, amount, target):
+      # Commits the max bid and returns the reply for its owner.
+      if normalize_category(target) in CATEGORIES:
+          scope, target = 'category', normalize_category(target)
+      elif target:
+          # A player still to come up, or the one up now.
+          scope = 'player'
+          up_now = view.current_player is not None and target == view.current_player['name']
+          withdrawing = not amount and (owner, 'player', target) in session.proxies
+          if target not in session.players_for_auction and not up_now and not withdrawing:
+              return f"'{target}' is not a category ({', '.join(CATEGORIES)}) or a player in the auction pool."
+      elif view.current_player is not None:
+          scope, target = 'player', view.current_player['name']
+      else:
+          return "No player is up yet; name a player or a category instead."
+
+      session.commit('set_proxy', owner=owner, scope=scope, target=target, amount=amount)
+      if view.apply_proxies():
+          view.extend_lot()
+          view.checkpoint()
+          view.bids.refresh()
+      if not amount:
+          return f"Your max bid for {target} is withdrawn."
+      reply = f"Your max bid for {target} is ${amount:,}."
+      if amount > session.purses.balance(owner):
+          reply += f" It is capped at your purse of ${session.purses.balance(owner):,}."
+      return reply
+
+
 #############################################################
 # Auction logics:
 #############################################################
 
 class AuctionView(discord.ui.View):
-  def __init__(self, *, timeout=180):
+  # A persistent view (no timeout, stable custom_ids): after a restart it is
+  # rebuilt from the lot checkpoint and re-attached to its message. A resumed
+  # view knows only its league's key until the first click loads the league.
+  def __init__(self, session, *, timeout=None, session_key=None):
       super().__init__(timeout=timeout)
+      self.session = session
+      self.session_key = session.key if session is not None else session_key
+      self.message = None
       self.current_player = None
       self.current_bid = 0
       self.highest_bidder = None
       self.highest_bidder_id = None
+      # Accepted bids and distinct bidders on the open lot, for the sale ledger.
+      self.lot_bids = 0
+      self.lot_bidders = set()
+      self.bids = BidEngine(self)
+      # Timed lots: the deadline on LOT_TIMERS' clock, the "going" stage
+      # shown under the bid, and a lock so a closing timer and the Sold or
+      # Next buttons never settle the same lot twice.
+      self.deadline = None
+      self.lot_stage = None
+      self.lot_lock = asyncio.Lock()
+
+  @classmethod
+  def from_lot(cls, session_key, lot):
+      view = cls(None, session_key=session_key)
+      view.current_player = lot['player']
+      view.current_bid = lot['bid']
+      view.highest_bidder = lot['bidder_name']
+      view.highest_bidder_id = lot['bidder_id']
+      view.lot_bids = lot.get('bids', 0)
+      view.lot_bidders = set(lot.get('bidders', []))
+      if view.current_player is not None:
+          for item in view.children:
+              item.disabled = item.custom_id == 'start_auction'
+      return view
+
+  def lot_state(self):
+      return {
+          'player': self.current_player,
+          'bid': self.current_bid,
+          'bidder_name': self.highest_bidder,
+          'bidder_id': self.highest_bidder_id,
+          'bids': self.lot_bids,
+          'bidders': sorted(self.lot_bidders),
+          # Wall-clock close time, so a resumed lot keeps its timer
+          'ends_at': None if self.deadline is None else time.time() + self.deadline - LOT_TIMERS.clock(),
+          'message_id': self.message.id,
+          'channel_id': self.message.channel.id,
+      }
+
+  def checkpoint(self):
+      # Cheap enough for every accepted bid: one small file or row, written
+      # by the store's writer thread.
+      if self.session is not None and self.message is not None:
+          self.session.save_lot(self.message.id, self.lot_state())
+
+  def close_lot(self):
+      LOT_TIMERS.cancel(self)
+      self.deadline = self.lot_stage = None
+      self.session.purses.release(self)
+      if self.message is not None:
+          self.session.save_lot(self.message.id, None)
+      self.session.active_auctions.discard(self)
+      self.bids.close()
+      self.stop()
+
+  def attach(self, session):
+      # Gives a resumed view its league and re-holds the high bid.
+      self.session = session
+      session.active_auctions.add(self)
+      if self.highest_bidder_id is not None and self.highest_bidder_id in session.purses:
+          session.purses.reserve(self, self.highest_bidder_id, self.current_bid)
+
+  async def interaction_check(self, interaction: discord.Interaction):
+      if self.session is None:
+          self.attach(await SESSIONS.get(*self.session_key))
+      if self.message is None and interaction.message is not None:
+          self.message = interaction.message
+      return True
+
+  def apply_bid(self, user):
+    # Applies one bid from user. Returns None if it was accepted, otherwise
+    # the reason it was rejected.
+    if self.current_player is None:
+        return "No player is currently being auctioned!"
+    if self.highest_bidder_id == user.id:
+        return "You already hold the highest bid."
+
+    # Determine the increment based on the base price
+    increment = bid_increment(self.current_player.get('base_price', 0))
+
+    # Check user's current purse against the proposed bid
+    # Money the user leads other open lots with is not available here.
+    user_id_str = owner_key(user.id)
+    if self.session.purses.can_afford(user_id_str, self.current_bid + increment, hold=self):
+        # Increment the current bid and make the user the highest bidder
+        self.current_bid += increment
+        self.highest_bidder = user.display_name
+        self.highest_bidder_id = user.id
+        self.lot_bids += 1
+        self.lot_bidders.add(user.id)
+        self.session.purses.reserve(self, user_id_str, self.current_bid)
+        return None
+    # User does not have enough in their purse to make this bid
+    return "Lode ruk ja gareeb h tu"
+
+  def apply_proxies(self):
+      # Lets standing max bids answer the current high bid. Returns True if
+      # the lot changed.
+      if self.current_player is None:
+          return False
+      result = resolve_proxies(self.session, self.current_player, self.current_bid, self.highest_bidder_id, hold=self)
+      if result is None:
+          return False
+      owner, price, bidders = result
+      increment = bid_increment(self.current_player.get('base_price', 0))
+      self.lot_bids += max(1, (price - self.current_bid) // increment)
+      self.lot_bidders.update(int(bidder) for bidder in bidders)
+      self.current_bid = price
+      self.highest_bidder = f"{self.session.owner_index[owner]} (max bid)"
+      self.highest_bidder_id = int(owner)
+      self.session.purses.reserve(self, owner, price)
+      return True
+
+  def leader_line(self):
+      if self.highest_bidder_id is None:
+          return ""
+      return f"\nHighest bidder: {self.highest_bidder} at {self.current_bid}"
+
+  def bid_message(self):
+    formatted_bid = f"${self.current_bid:,.2f}"
+    message = f"Current player: {self.current_player['name']}\nCurrent bid: {formatted_bid}\nHighest bidder: {self.highest_bidder}\n"
+    if self.lot_stage:
+        message += f"**{self.lot_stage}...**\n"
+    return message
+
+  def open_next_lot(self):
+      # Puts the next player in the pool up at their base price, lets standing
+      # max bids answer, and starts the lot timer. Returns the starting bid.
+      self.current_player = self.session.players_for_auction.peek()
+      self.session.commit('pop_player', name=self.current_player['name'])
+      self.current_bid = self.current_player['base_price']
+      self.highest_bidder = None
+      self.highest_bidder_id = None
+      self.session.purses.release(self)
+      self.lot_bids, self.lot_bidders = 0, set()
+      self.bids.reset_stats()
+      starting_bid = self.current_bid
+      self.apply_proxies()
+      self.start_timer()
+      self.checkpoint()
+      return starting_bid
+
+  def next_lot_message(self, starting_bid):
+      return (
+          f"Next up for auction: {self.current_player['name']} ({self.current_player['category']})\n"
+          f"Starting bid: {starting_bid}\n"
+          f"Place your bids!"
+      ) + self.leader_line()
+
+  def sell_current(self):
+      # Sells the current player to the highest bidder. Returns None once the
+      # sale is committed, otherwise why it could not be.
+      winner_id = owner_key(self.highest_bidder_id)
+      player_name = self.current_player["name"]
+      team_name = self.session.owner_index.get(winner_id)
+      if team_name is None:
+          log.warning("No matching team found for winner %s.", winner_id)
+      if winner_id not in self.session.purses:
+          return f"The highest bidder ({winner_id}) is not registered."
+
+      # Check if the winner has enough in their purse
+      winning_bid = self.current_bid
+      if not self.session.purses.can_afford(winner_id, winning_bid, hold=self):
+          return f"{team_name or self.highest_bidder} does not have enough in their purse to complete this purchase."
+      # Handle case where the team is at capacity or player is already in the team
+      if team_name not in self.session.teams or player_name in self.session.player_index or self.session.teams[team_name].is_full():
+          return f"Cannot transfer {player_name} to {team_name}. Check team capacity or player membership."
+      # The sale's debit replaces the hold on the high bid.
+      self.session.purses.release(self)
+      self.session.commit('sell', team=team_name, winner=winner_id, player=player_name, price=winning_bid, ts=time.time(),
+                          category=self.current_player.get('category'), base_price=self.current_player.get('base_price', winning_bid),
+                          bids=self.lot_bids, bidders=len(self.lot_bidders))
+      return None
+
+  def mark_current_unsold(self):
+      self.session.purses.release(self)
+      if self.current_player and self.current_player['name'] not in self.session.unsold_players:
+          self.session.commit('mark_unsold', player=self.current_player, bids=self.lot_bids,
+                              bidders=len(self.lot_bidders), ts=time.time())
+
+  def start_timer(self):
+      self.lot_stage = None
+      if not self.session.lot_seconds:
+          self.deadline = None
+          LOT_TIMERS.cancel(self)
+          return
+      self.deadline = LOT_TIMERS.clock() + max(self.session.lot_seconds, self.session.soft_close)
+      self._schedule_stage()
+
+  def extend_lot(self):
+      # Soft close: a bid inside the closing window buys soft_close seconds.
+      if self.deadline is None:
+          return
+      extended = LOT_TIMERS.clock() + self.session.soft_close
+      if extended > self.deadline:
+          self.deadline = extended
+          self.lot_stage = None
+          self._schedule_stage()
+
+  def _schedule_stage(self):
+      # One pending timer per view, for whichever of "going once", "going
+      # twice" and the close is next; the stages split the soft close window.
+      window = self.session.soft_close
+      stages = (("Going once", self.deadline - window * 2 / 3), ("Going twice", self.deadline - window / 3))
+      passed = [name for name, _ in stages].index(self.lot_stage) + 1 if self.lot_stage else 0
+      now = LOT_TIMERS.clock()
+      for stage, when in stages[passed:]:
+          if when > now:
+              LOT_TIMERS.schedule(self, when, functools.partial(self._on_stage, stage))
+              return
+      LOT_TIMERS.schedule(self, self.deadline, self.expire_lot)
+
+  def _on_stage(self, stage):
+      self.lot_stage = stage
+      self.bids.refresh()
+      self._schedule_stage()
+
+  async def expire_lot(self):
+      # The lot timer ran out: sell to the high bidder or pass the player,
+      # then open the next lot in the same message.
+      async with self.lot_lock:
+          if self.current_player is None or self.deadline is None or LOT_TIMERS.clock() < self.deadline:
+              return
+          await self.bids.drain(render=False)
+          if LOT_TIMERS.clock() < self.deadline:
+              # A bid still in the queue extended the lot
+              return
+          player_name = self.current_player['name']
+          error = self.sell_current() if self.highest_bidder_id is not None else "no bids"
+          if error is None:
+              log.info("Lot closed on timer: %s sold for %s: %s", player_name, self.current_bid, self.bids.stats())
+              announcement = f"Sold! {player_name} goes to {self.session.owner_index[owner_key(self.highest_bidder_id)]} for {self.current_bid}."
+          else:
+              log.info("Lot closed on timer: %s unsold (%s): %s", player_name, error, self.bids.stats())
+              self.mark_current_unsold()
+              announcement = f"{player_name} goes unsold."
+          # Move on first: a failed announcement must not leave the
+          # auction sitting on a closed lot.
+          if self.session.players_for_auction:
+              content, view = self.next_lot_message(self.open_next_lot()), self
+          else:
+              self.reset_auction_state()
+              self.close_lot()
+              content, view = "No more players left for auction.", None
+          try:
+              await self.message.channel.send(announcement)
+          except discord.HTTPException as e:
+              log.warning("Could not announce a timed lot: %s", e)
+          try:
+              await self.message.edit(content=content, view=view)
+          except discord.HTTPException as e:
+              log.warning("Could not show the next lot: %s", e)
+
+  async def on_timeout(self):
+    self.session.active_auctions.discard(self)
 
   def reset_auction_state(self):
     # Reset all auction-related attributes to their default states
     self.current_bid = self.current_bid
+    self.highest_bidder = None
     self.highest_bidder_id = None
     self.current_player = None  
 
   @discord.ui.button(label="Start Auction", style=discord.ButtonStyle.green, custom_id="start_auction")
+  @timed_callback('start_auction')
   async def start_auction(self, interaction: discord.Interaction, button: discord.ui.Button):
     # Check if there are players for auction
-    if not PLAYERS_FOR_AUCTION:
+    if not self.session.players_for_auction:
         await interaction.response.send_message("No players available for auction.", ephemeral=True)
         return
 
-    # Select the first player from the list
-    self.current_player = PLAYERS_FOR_AUCTION.pop(0)  # This removes the player from the auction list and sets them as the current player
-    if self.current_bid < 100000:
-       self.current_bid = self.current_player['base_price']
-    formatted_bid = f"${self.current_bid:,.2f}"
-    self.highest_bidder = None  # Reset highest bidder
+    # Put the first player up at their base price
+    self.open_next_lot()
+    formatted_bid = f"${self.current_player['base_price']:,.2f}"
 
     # Disable the 'Start Auction' button as the auction has now started
     button.disabled = True
@@ -370,173 +3777,186 @@ class AuctionView(discord.ui.View):
         if item.custom_id != 'start_auction':
             item.disabled = False
 
-    # Create a new AuctionView instance
-    auction_view = AuctionView()
-
-
     # Construct the message to display player details
     player_details = f"**Current Player for Auction:** {self.current_player['name']} - {self.current_player['category']}\n"
     player_details += f"**Base Price:** {formatted_bid}\n"
     player_details += "Place your bids!"
+    player_details += self.leader_line()
 
     # Update the message with the new details
     await interaction.response.edit_message(content=player_details, view=self)
 
   @discord.ui.button(label="Next Player", style=discord.ButtonStyle.blurple, custom_id="next_player")
+  @timed_callback('next_player')
   async def next_player(self, interaction: discord.Interaction, button: discord.ui.Button):
 
-      if str(interaction.user.id) not in AUTHORIZED_USER_IDS:
+      if str(interaction.user.id) not in self.session.authorized_user_ids:
          # User is not authorized to click the Sold button
          await interaction.response.send_message("phir a gaya lode, abhi bhi tera kaam ni h.", ephemeral=True)
          return
 
-      #  Move the current player to the 'unsold' list if they exist and were not sold
-      if self.current_player and self.current_player not in UNSOLD_PLAYERS:
-          UNSOLD_PLAYERS.append(self.current_player)
-          save_data()  
-    
-      # Check if there is a next player in the auction list
-      if not PLAYERS_FOR_AUCTION: 
-          await interaction.response.edit_message(content="No more players left for auction.", view=None)
-          return
+      async with self.lot_lock:
+          # Let queued bids land first; this edit replaces the bid display anyway
+          await self.bids.drain(render=False)
+          if self.current_player is not None:
+              log.info("Lot closed: %s unsold: %s", self.current_player['name'], self.bids.stats())
 
-      # Move to the next player in the list
-      self.current_player = PLAYERS_FOR_AUCTION.pop(0)  # Get and remove the first player from the list
-      self.current_bid = self.current_player['base_price']  # Set the starting bid to the player's base price
-      self.highest_bidder = None  # Reset the highest bidder for the new player
-      save_data()
+          #  Move the current player to the 'unsold' list if they exist and were not sold
+          self.mark_current_unsold()
 
-      # Update the message to show the new player's details
-      content = (
-          f"Next up for auction: {self.current_player['name']} ({self.current_player['category']})\n"
-          f"Starting bid: {self.current_bid}\n"
-          f"Place your bids!"
-      )
+          # Check if there is a next player in the auction list
+          if not self.session.players_for_auction:
+              await interaction.response.edit_message(content="No more players left for auction.", view=None)
+              self.close_lot()
+              return
 
-      # Disable the Next Player button if this is the last player
-      if not PLAYERS_FOR_AUCTION:
-          button.disabled = True
+          # Move to the next player in the list
+          content = self.next_lot_message(self.open_next_lot())
 
-      # Respond to the interaction to update the message with new player details
-      await interaction.response.edit_message(content=content, view=self)
+          # Disable the Next Player button if this is the last player
+          if not self.session.players_for_auction:
+              button.disabled = True
+
+          # Respond to the interaction to update the message with new player details
+          await interaction.response.edit_message(content=content, view=self)
 
 
   @discord.ui.button(label="Bid", style=discord.ButtonStyle.grey, custom_id="bid")
+  @timed_callback('bid')
   async def bid(self, interaction: discord.Interaction, button: discord.ui.Button):
       # Check if there's already an auction in progress with a player
       if self.current_player is None:
           await interaction.response.send_message("No player is currently being auctioned!", ephemeral=True)
           return
 
-      # Determine the increment based on the base price
-      base_price = self.current_player.get('base_price', 0)  
-      if base_price >= 200000:
-          increment = 50000
-      elif base_price >= 150000:
-          increment = 30000
-      elif base_price >= 100000:
-          increment = 20000
-      else:
-          increment = 10000  
-
-      # Check user's current purse against the proposed bid
-      user_id_str = str(interaction.user.id) 
-      if user_id_str in USERS and USERS[user_id_str]['purse'] >= self.current_bid + increment:
-          # Increment the current bid since user has enough in their purse
-          self.current_bid += increment
-          formatted_bid = f"${self.current_bid:,.2f}"
+      # Queued and applied in order by the bid engine, which also updates the message
+      await self.bids.submit(interaction)
 
-          # Update the highest bidder to the user who clicked the button
-          self.highest_bidder = interaction.user.display_name
-          self.highest_bidder_id = interaction.user.id
 
-          # Construct the new auction message
-          auction_message = f"Current player: {self.current_player['name']}\nCurrent bid: {formatted_bid}\nHighest bidder: {self.highest_bidder}\n"
-
-          # Update the message to reflect the new highest bid
-          await interaction.response.edit_message(content=auction_message, view=self)
-      else:
-          # User does not have enough in their purse to make this bid
-          await interaction.response.send_message("Lode ruk ja gareeb h tu", ephemeral=True)
+  @discord.ui.button(label="Max Bid", style=discord.ButtonStyle.grey, custom_id="max_bid")
+  @timed_callback('max_bid')
+  async def max_bid(self, interaction: discord.Interaction, button: discord.ui.Button):
+      # Private: the amount goes through a modal and every reply is ephemeral.
+      await interaction.response.send_modal(MaxBidModal(self))
 
 
   @discord.ui.button(label="Sold Player", style=discord.ButtonStyle.red, custom_id="sold_player")
+  @timed_callback('sold_player')
   async def sold_player(self, interaction: discord.Interaction, button: discord.ui.Button):
 
-      if str(interaction.user.id) not in AUTHORIZED_USER_IDS:
+      if str(interaction.user.id) not in self.session.authorized_user_ids:
         # User is not authorized to click the Sold button
         await interaction.response.send_message("Chal bey lode tera kaam ni h.", ephemeral=True)
         return
-        
-      # Extract the winner's ID and validate against USERS
-      if interaction.user.id == auctioneer_id or interaction.user.id == self.highest_bidder_id:
-         winner_id = self.highest_bidder_id
-         winner_id = str(winner_id)
-      player_name = self.current_player["name"]
-      team_name = None  
-      print(f"Winner ID: {winner_id}")
-
-      for team, details in TEAMS.items():
-          print(f"Team: {team}, Owner ID: {details['owner']}")
-          if str(details['owner']) == str(winner_id):  # Ensure both sides of the comparison are strings
-              team_name = team
-              print(f"Found matching team: {team}")  # Debug print to confirm matching team is found
-              break
 
-          if team_name is None:
-             print("No matching team found for the winner.")
-
-
-
-
-
-      if winner_id not in USERS:
-          await interaction.response.send_message("The highest bidder is not registered.", ephemeral=True)
-          await interaction.followup.send(f"{winner_id}")
-          return
-
-      # Check if the winner has enough in their purse
-      winning_bid = self.current_bid
-      if winner_id in USERS and USERS[winner_id]["purse"] >= winning_bid:
-          # Deduct the winning bid from the winner's purse
-          USERS[winner_id]["purse"] -= winning_bid
-
-          # Transfer the player to the winning team
-          if team_name in TEAMS and player_name not in TEAMS[team_name]["players"]:
-              TEAMS[team_name]["players"].append(player_name)
-              TEAMS[team_name]["purse"] -= winning_bid  
-              save_data()
-
-              # Send confirmation messages
-              winning_bidder_user = await interaction.client.fetch_user(winner_id)
-              await interaction.response.send_message(content=f"{player_name} has been sold to {team_name} for {winning_bid}.")
-              await interaction.followup.send(f"{winning_bidder_user.display_name}'s new purse balance is {USERS[winner_id]['purse']}")
-
-              if PLAYERS_FOR_AUCTION:  # Check if there are more players to auction
-                self.current_player = PLAYERS_FOR_AUCTION.pop(0)  # Move to the next player
-                self.current_bid = self.current_player['base_price']  # Reset the bid to the new player's base price
-                self.highest_bidder_id = None  # Reset the highest bidder
-
-                # Update the auction message for the new player
-                formatted_bid = f"${self.current_bid:,.2f}"
-                new_auction_message = f"Next up for auction: {self.current_player['name']}\nStarting bid: {self.current_bid}"
-                await interaction.followup.send(new_auction_message)  # Notify channel of the new auction
-              else:
-                # No more players left to auction
-                await interaction.followup.send("No more players left for auction.")
-                self.reset_auction_state() 
+      async with self.lot_lock:
+          # Every bid clicked before Sold counts, and the final bid is shown
+          await self.bids.drain()
+
+          if self.current_player is None or self.highest_bidder_id is None:
+              await interaction.response.send_message("No bids have been placed on this player.", ephemeral=True)
+              return
+
+          winner_id = owner_key(self.highest_bidder_id)
+          player_name, team_name, winning_bid = self.current_player["name"], self.session.owner_index.get(winner_id), self.current_bid
+          error = self.sell_current()
+          if error:
+              await interaction.response.send_message(error)
+              return
+          log.info("Lot closed: %s sold for %s: %s", player_name, winning_bid, self.bids.stats())
+          balance = self.session.purses.balance(winner_id)
+
+          # Move on before any Discord call, so bids clicked meanwhile land
+          # on the next lot rather than the one just sold.
+          if self.session.players_for_auction:  # Check if there are more players to auction
+            next_lot = self.next_lot_message(self.open_next_lot())
           else:
-              # Handle case where the team is at capacity or player is already in the team
-              await interaction.followup.send(f"Cannot transfer {player_name} to {team_name}. Check team capacity or player membership.")
-      else:
-          # Handle case where the winner does not have enough funds
-          await interaction.followup.send(f"{interaction.user.display_name} does not have enough in their purse to complete this purchase.")
+            # No more players left to auction
+            next_lot = "No more players left for auction."
+            self.reset_auction_state()
+            self.close_lot()
+
+          # Send confirmation messages
+          await interaction.response.send_message(content=f"{player_name} has been sold to {team_name} for {winning_bid}.")
+          winning_bidder_user = await USER_CACHE.resolve(interaction.client, winner_id)
+          winner_name = winning_bidder_user.display_name if winning_bidder_user else team_name
+          await interaction.followup.send(f"{winner_name}'s new purse balance is {balance}")
+          # Notify channel of the new auction
+          await interaction.followup.send(next_lot)
 
 @bot.command(name='start_auction')
 @commands.has_permissions(administrator=True)
 async def start_auction(ctx):
-    view = AuctionView()
-    await ctx.send("Auction is starting!", view=view)
+    session = await league(ctx)
+    view = AuctionView(session)
+    session.active_auctions.add(view)
+    view.message = view.bids.message = await ctx.send("Auction is starting!", view=view)
+    view.checkpoint()
 
-bot.run(os.environ['TOKEN'])
+
+#############################################################
+# Auction resume:
+#############################################################
+# On startup every league's lot checkpoint (a tiny file or row, never the
+# full league data) is read, and each open auction view is rebuilt and
+# re-attached to its message with bot.add_view. Refreshing the messages is
+# bounded by RESUME_TIMEOUT; the views accept clicks even before that.
+RESUME_TIMEOUT = float(os.environ.get('RESUME_TIMEOUT', 10))
+_resumed = False
+
+
+async def _refresh_resumed_message(view, lot):
+    channel = bot.get_channel(lot['channel_id']) or await bot.fetch_channel(lot['channel_id'])
+    view.message = view.bids.message = channel.get_partial_message(lot['message_id'])
+    try:
+        if view.current_player is None:
+            await view.message.edit(content="Auction is starting!", view=view)
+        else:
+            await view.message.edit(content=view.bid_message(), view=view)
+            if lot.get('ends_at') is not None:
+                # A timed lot needs its league to close itself; it gets at
+                # least the soft close window to take bids after the restart.
+                view.attach(await SESSIONS.get(*view.session_key))
+                remaining = max(lot['ends_at'] - time.time(), view.session.soft_close)
+                view.deadline = LOT_TIMERS.clock() + remaining
+                view._schedule_stage()
+    except discord.NotFound:
+        # The auction message is gone: put the lot's player back in the pool.
+        view.stop()
+        session = await SESSIONS.get(*view.session_key)
+        if view.current_player is not None and view.current_player['name'] not in session.players_for_auction:
+            session.commit('add_auction_player', player=view.current_player)
+        session.save_lot(lot['message_id'], None)
+        log.warning("Auction message %s is gone; requeued %s.", lot['message_id'], view.current_player and view.current_player['name'])
+
+async def resume_open_auctions():
+    # Returns the keys of the leagues with an open lot.
+    global _resumed
+    if _resumed:
+        return []
+    _resumed = True
+    started = time.monotonic()
+    lots = await asyncio.to_thread(SESSIONS.lot_checkpoints)
+    refreshes = []
+    for key, lot in lots:
+        view = AuctionView.from_lot(key, lot)
+        bot.add_view(view, message_id=lot['message_id'])
+        refreshes.append(asyncio.create_task(_refresh_resumed_message(view, lot)))
+    if refreshes:
+        done, pending = await asyncio.wait(refreshes, timeout=RESUME_TIMEOUT)
+        for task in done:
+            if task.exception():
+                log.warning("Could not refresh a resumed auction: %s", task.exception())
+        if pending:
+            log.warning("%d auction messages are still refreshing after %ss.", len(pending), RESUME_TIMEOUT)
+    log.info("Resumed %d open auctions in %.2fs.", len(lots), time.monotonic() - started)
+    return sorted({key for key, _ in lots})
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['migrate-sqlite']:
+    migrate_json_to_sqlite()
+  else:
+    mark_startup('imported')
+    start_web_server()
+    bot.run(os.environ['TOKEN'])
 
@@ -0,0 +1,150 @@
+import os
+
+os.environ.setdefault('TOKEN', 'test')
+
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def json_backend(monkeypatch):
+    monkeypatch.setattr(main, 'STORAGE_BACKEND', 'json')
+
+
+def open_session(directory):
+    session = main.LeagueSession((0, 0), str(directory))
+    session.load()
+    return session
+
+
+def record_auction(session):
+    session.commit('create_team', team='Dream Team', owner='111', max_size=5, purse=500000, ts=1.0)
+    session.commit('create_team', team='Rivals', owner='112', max_size=5, purse=300000, ts=1.0)
+    for name, category, base_price in (('John Doe', 'Batsmen', 50000), ('Ravi K', 'Bowlers', 120000),
+                                       ('Sam Q', 'Allrounders', 100000)):
+        session.commit('add_auction_player', player={'name': name, 'category': category, 'base_price': base_price})
+    session.commit('pop_player', name='John Doe')
+    session.commit('sell', team='Dream Team', winner='111', player='John Doe', price=80000, ts=2.0,
+                   category='Batsmen', base_price=50000, bids=3, bidders=2)
+    session.commit('set_purse', user='112', amount=250000, ts=3.0)
+
+
+def crash(session):
+    # Stop the writer without the compaction a clean close would do.
+    session.store.flush()
+    session.store.close()
+
+
+def test_journal_replays_onto_empty_snapshot(tmp_path):
+    session = open_session(tmp_path)
+    record_auction(session)
+    state = session.to_dict()
+    crash(session)
+
+    reloaded = open_session(tmp_path)
+    assert reloaded.to_dict() == state
+    assert reloaded.purses.balance('111') == 420000
+    assert reloaded.teams['Dream Team'].players == ['John Doe']
+    reloaded.close()
+
+
+def test_snapshot_plus_journal_tail(tmp_path):
+    session = open_session(tmp_path)
+    record_auction(session)
+    session.store.compact()
+    session.commit('sell', team='Rivals', winner='112', player='Ravi K', price=150000, ts=4.0,
+                   category='Bowlers', base_price=120000)
+    state = session.to_dict()
+    crash(session)
+
+    reloaded = open_session(tmp_path)
+    assert reloaded.to_dict() == state
+    assert reloaded.store.seq == session.store.seq
+    reloaded.close()
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    session = open_session(tmp_path)
+    record_auction(session)
+    state = session.to_dict()
+    crash(session)
+    journal_path = os.path.join(tmp_path, main.JOURNAL_FILE)
+    with open(journal_path, 'a') as f:
+        f.write('{"op":"sell","team":"Riv')
+
+    reloaded = open_session(tmp_path)
+    assert reloaded.to_dict() == state
+    # New events go after the last whole line, not after the garbage.
+    reloaded.commit('remove_auction_player', name='Sam Q')
+    state = reloaded.to_dict()
+    crash(reloaded)
+
+    again = open_session(tmp_path)
+    assert again.to_dict() == state
+    assert 'Sam Q' not in again.players_for_auction
+    again.close()
+
+
+def test_failed_write_does_not_stop_the_writer(tmp_path):
+    session = open_session(tmp_path)
+    write = session.store._write
+    failures = []
+
+    def fail_once(batch):
+        if not failures:
+            failures.append(batch)
+            raise OSError('No space left on device')
+        write(batch)
+
+    session.store._write = fail_once
+    session.commit('create_team', team='Dream Team', owner='111', max_size=5, purse=500000, ts=1.0)
+    session.store.flush()
+    session.commit('create_team', team='Rivals', owner='112', max_size=5, purse=300000, ts=1.0)
+    session.store.flush()
+    assert failures and session.store._thread.is_alive()
+    state = session.to_dict()
+    session.close()
+
+    # The lost event is back through the snapshot written on close.
+    reloaded = open_session(tmp_path)
+    assert reloaded.to_dict() == state
+    reloaded.close()
+
+
+def lot(message_id, name):
+    return {'player': {'name': name, 'category': 'Batsmen', 'base_price': 50000}, 'bid': 60000,
+            'bidder_name': 'owner', 'bidder_id': '111', 'bids': 1, 'bidders': ['111'],
+            'ends_at': None, 'message_id': message_id, 'channel_id': 7}
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_each_auction_message_has_its_own_checkpoint(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(main, 'STORAGE_BACKEND', backend)
+    session = open_session(tmp_path)
+    session.save_lot(101, lot(101, 'John Doe'))
+    session.save_lot(202, {**lot(202, 'Ravi K'), 'player': None})
+    session.save_lot(202, None)
+    session.save_lot(303, lot(303, 'Sam Q'))
+    crash(session)
+
+    reloaded = open_session(tmp_path)
+    assert reloaded.lots == {101: lot(101, 'John Doe'), 303: lot(303, 'Sam Q')}
+    reloaded.close()
+
+
+def test_corrupt_line_before_the_end_is_an_error(tmp_path):
+    session = open_session(tmp_path)
+    record_auction(session)
+    crash(session)
+    journal_path = os.path.join(tmp_path, main.JOURNAL_FILE)
+    with open(journal_path) as f:
+        lines = f.readlines()
+    lines[2] = '{"op":"add_auc\n'
+    with open(journal_path, 'w') as f:
+        f.writelines(lines)
+
+    with pytest.raises(ValueError, match='line 3'):
+        open_session(tmp_path)
+    with open(journal_path) as f:
+        assert f.readlines() == lines
@@ -0,0 +1,95 @@
+import os
+import itertools
+import random
+
+os.environ.setdefault('TOKEN', 'test')
+
+import pytest
+
+import main
+
+
+CATEGORIES = ['Batsmen', 'Bowlers', 'Allrounders']
+
+
+def brute_force(players, slots, budget, needs, premiums=None):
+    # Best base value over every subset of at most `slots` players.
+    def price(player):
+        if not premiums:
+            return player['base_price']
+        return int(player['base_price'] * (1 + premiums.get(player['category'], 0.0)))
+
+    best = None
+    for size in range(slots + 1):
+        for picks in itertools.combinations(players, size):
+            cost = sum(price(player) for player in picks)
+            if cost > budget:
+                continue
+            counts = {category: sum(1 for player in picks if player['category'] == category) for category in needs}
+            if any(counts[category] < count for category, count in needs.items()):
+                continue
+            value = sum(player['base_price'] for player in picks)
+            if best is None or value > best:
+                best = value
+    return best
+
+
+def random_pool(rng, size):
+    return [{'name': f'Player {n}', 'category': rng.choice(CATEGORIES),
+             'base_price': rng.choice([10000, 20000, 30000, 50000, 80000, 100000, 150000])}
+            for n in range(size)]
+
+
+def check_plan(plan, players, slots, budget, needs):
+    picks, cost, value, exact = plan
+    assert exact
+    assert len(picks) <= slots
+    assert cost == sum(price for _, price in picks) <= budget
+    assert value == sum(player['base_price'] for player, _ in picks)
+    names = [player['name'] for player, _ in picks]
+    assert len(names) == len(set(names))
+    assert set(names) <= {player['name'] for player in players}
+    for category, count in needs.items():
+        assert sum(1 for player, _ in picks if player['category'] == category) >= count
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    players = random_pool(rng, rng.randint(0, 9))
+    slots = rng.randint(0, 5)
+    budget = rng.choice([0, 50000, 120000, 200000, 350000, 1000000])
+    needs = {category: rng.randint(0, 2) for category in rng.sample(CATEGORIES, rng.randint(0, 2))}
+    premiums = {category: rng.choice([0.0, 0.25, 0.5]) for category in CATEGORIES} if seed % 2 else None
+
+    plan = main.plan_roster(players, slots, budget, needs, premiums)
+    expected = brute_force(players, slots, budget, needs, premiums)
+    if expected is None:
+        assert plan is None
+    else:
+        check_plan(plan, players, slots, budget, needs)
+        assert plan[2] == expected
+
+
+def test_budget_too_small_for_the_needs():
+    players = [{'name': 'A', 'category': 'Bowlers', 'base_price': 50000},
+               {'name': 'B', 'category': 'Bowlers', 'base_price': 60000},
+               {'name': 'C', 'category': 'Batsmen', 'base_price': 10000}]
+    needs = {'Bowlers': 2}
+    assert brute_force(players, 3, 100000, needs) is None
+    assert main.plan_roster(players, 3, 100000, needs) is None
+    assert main.plan_roster(players, 3, 110000, needs)[2] == 110000
+
+
+def test_need_from_a_category_with_no_players():
+    players = [{'name': 'A', 'category': 'Bowlers', 'base_price': 50000},
+               {'name': 'B', 'category': 'Batsmen', 'base_price': 60000}]
+    assert main.plan_roster(players, 2, 1000000, {'Allrounders': 1}) is None
+    picks, cost, value, exact = main.plan_roster(players, 2, 1000000, {'Allrounders': 0})
+    assert sorted(player['name'] for player, _ in picks) == ['A', 'B']
+    assert (cost, value, exact) == (110000, 110000, True)
+
+
+def test_empty_pool():
+    assert main.plan_roster([], 3, 100000, {}) == ([], 0, 0, True)
+    assert main.plan_roster([], 3, 100000, {'Bowlers': 1}) is None
@@ -0,0 +1,97 @@
+import os
+
+os.environ.setdefault('TOKEN', 'test')
+
+import pytest
+
+import main
+
+
+# Base price 50000 bids in steps of 10000.
+PLAYER = {'name': 'John Doe', 'category': 'Batsmen', 'base_price': 50000}
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'STORAGE_BACKEND', 'json')
+    session = main.LeagueSession((0, 0), str(tmp_path))
+    session.load()
+    for team, owner in (('Dream Team', '111'), ('Rivals', '112'), ('Outsiders', '113')):
+        session.commit('create_team', team=team, owner=owner, max_size=5, purse=500000, ts=1.0)
+    yield session
+    session.close()
+
+
+def set_max(session, owner, amount, scope='player', target=PLAYER['name']):
+    session.commit('set_proxy', owner=owner, scope=scope, target=target, amount=amount)
+
+
+def test_equal_maxes_go_to_the_first_registered(session):
+    set_max(session, '112', 100000)
+    set_max(session, '111', 100000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) == ('112', 100000, ['112', '111'])
+
+
+def test_changed_max_counts_as_newly_registered(session):
+    set_max(session, '112', 100000)
+    set_max(session, '111', 100000)
+    set_max(session, '112', 90000)
+    set_max(session, '112', 100000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) == ('111', 100000, ['111', '112'])
+
+
+def test_max_below_the_current_bid_does_nothing(session):
+    set_max(session, '111', 40000)
+    assert main.resolve_proxies(session, PLAYER, 50000, '113') is None
+
+
+def test_max_one_increment_short_does_nothing(session):
+    set_max(session, '111', 59999)
+    assert main.resolve_proxies(session, PLAYER, 50000, '113') is None
+
+
+def test_leader_does_not_outbid_themselves(session):
+    set_max(session, '111', 200000)
+    assert main.resolve_proxies(session, PLAYER, 60000, '111') is None
+
+
+def test_leader_answers_a_rival_max_by_one_increment(session):
+    set_max(session, '111', 200000)
+    set_max(session, '112', 90000)
+    assert main.resolve_proxies(session, PLAYER, 60000, '111') == ('111', 100000, ['111', '112'])
+
+
+def test_rival_max_beats_the_leader_by_one_increment(session):
+    set_max(session, '112', 90000)
+    assert main.resolve_proxies(session, PLAYER, 60000, '111') == ('112', 70000, ['112', '111'])
+
+
+def test_category_max_applies_and_player_max_overrides_it(session):
+    set_max(session, '111', 150000, scope='category', target='Batsmen')
+    set_max(session, '112', 80000, scope='category', target='Batsmen')
+    assert main.resolve_proxies(session, PLAYER, 50000, None) == ('111', 90000, ['111', '112'])
+    set_max(session, '111', 70000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) == ('112', 80000, ['112', '111'])
+
+
+def test_max_is_capped_by_the_purse(session):
+    session.commit('set_purse', user='111', amount=120000, ts=2.0)
+    set_max(session, '111', 500000)
+    set_max(session, '112', 300000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) == ('112', 130000, ['112', '111'])
+
+
+def test_max_is_capped_by_bids_led_on_other_lots(session):
+    session.commit('set_purse', user='111', amount=120000, ts=2.0)
+    session.purses.reserve('other lot', '111', 100000)
+    set_max(session, '111', 500000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) is None
+    # The bid held on this lot is the owner's to raise.
+    assert main.resolve_proxies(session, PLAYER, 50000, None, hold='other lot') == ('111', 60000, ['111'])
+
+
+def test_full_team_is_skipped(session):
+    session.commit('create_team', team='Tiny', owner='114', max_size=1, purse=500000, ts=1.0)
+    session.commit('add_player_to_team', team='Tiny', player='Sam Q')
+    set_max(session, '114', 300000)
+    assert main.resolve_proxies(session, PLAYER, 50000, None) is None